@@ -0,0 +1,10 @@
+"""
+pymcf 编译器基准测试，在仓库根目录运行：
+
+    python -m benchmarks compile -o bench.json
+    python -m benchmarks compile --compare baseline.json --threshold 1.2
+    python -m benchmarks quality
+    python -m benchmarks batch
+    python -m benchmarks codegen
+    python -m benchmarks watch
+"""
@@ -0,0 +1,122 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks import batch_reuse, codegen, compile_time, quality, watch_rebuild
+from benchmarks.scenarios import SCENARIOS
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_ = commands.add_parser("compile", help="编译耗时基准测试")
+    compile_.add_argument("scenarios", nargs="*", choices=[[], *SCENARIOS], metavar="SCENARIO",
+                          help=f"运行的场景，默认运行全部场景：{', '.join(SCENARIOS)}")
+    compile_.add_argument("-n", "--repeat", type=int, default=3, help="每个场景的运行次数")
+    compile_.add_argument("--scale", type=float, default=1.0, help="场景规模的倍数")
+    compile_.add_argument("-o", "--output", type=Path, help="将结果写入 JSON 文件")
+    compile_.add_argument("--compare", type=Path, metavar="BASELINE", help="与之前的结果比较")
+    compile_.add_argument("--threshold", type=float, default=1.2,
+                          help="比较时总耗时超过基准的倍数视为性能退化，返回非零退出码")
+
+    quality_ = commands.add_parser("quality", help="生成代码质量基准测试")
+    quality_.add_argument("scenarios", nargs="*", choices=[[], *SCENARIOS], metavar="SCENARIO",
+                          help="运行的场景，默认运行全部场景")
+    quality_.add_argument("--baseline", type=Path, default=quality.BASELINE, help="基准结果")
+    quality_.add_argument("--threshold", type=float, default=0.02,
+                          help="指标超过基准的 1 + THRESHOLD 倍时视为退化，返回非零退出码")
+    quality_.add_argument("--update", action="store_true", help="用本次结果更新基准")
+
+    commands.add_parser("batch", help="检查批量构建复用已导入的模组时输出与单独构建相同")
+    commands.add_parser("codegen", help="检查固定脚本生成的命令与预期相同")
+    commands.add_parser("watch", help="检查监视模式修改库模组后重新构建的输出与直接构建相同")
+
+    # 内部使用：在独立的解释器中构建单个脚本
+    run = commands.add_parser("_run")
+    run.add_argument("script", type=Path)
+    run.add_argument("work_dir", type=Path)
+    # 内部使用：在独立的解释器中以监视模式构建并重新构建
+    watch = commands.add_parser("_watch")
+    watch.add_argument("work_dir", type=Path)
+    watch.add_argument("out", type=Path)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = make_parser().parse_args(argv)
+    match args.command:
+        case "_run":
+            json.dump(compile_time.run_script(args.script, args.work_dir), sys.stdout)
+            return 0
+        case "_watch":
+            watch_rebuild.rebuild(args.work_dir, args.out)
+            return 0
+        case "compile":
+            result = compile_time.run(args.scenarios, args.repeat, args.scale)
+            if args.output is not None:
+                args.output.parent.mkdir(parents=True, exist_ok=True)
+                with args.output.open("wt", encoding="utf-8") as f:
+                    json.dump(result, f, indent=4)
+            else:
+                json.dump(result, sys.stdout, indent=4)
+                print()
+            if args.compare is not None:
+                with args.compare.open("rt", encoding="utf-8") as f:
+                    table, regressed = compile_time.compare(json.load(f), result, args.threshold)
+                print(table, file=sys.stderr)
+                if regressed:
+                    print(f"性能退化：{', '.join(regressed)}", file=sys.stderr)
+                    return 1
+            return 0
+        case "quality":
+            result = quality.run(args.scenarios)
+            if args.update:
+                baseline = {}
+                if args.baseline.exists():
+                    with args.baseline.open("rt", encoding="utf-8") as f:
+                        baseline = json.load(f)
+                baseline.update(result)
+                with args.baseline.open("wt", encoding="utf-8") as f:
+                    json.dump(baseline, f, indent=4)
+                    f.write("\n")
+                return 0
+            with args.baseline.open("rt", encoding="utf-8") as f:
+                table, regressed = quality.compare(json.load(f), result, args.threshold)
+            print(table)
+            if regressed:
+                print(f"生成代码退化：{', '.join(regressed)}", file=sys.stderr)
+                return 1
+            return 0
+        case "batch":
+            mismatches = batch_reuse.run()
+            for line in mismatches:
+                print(line, file=sys.stderr)
+            if mismatches:
+                print("批量构建的输出与单独构建不一致", file=sys.stderr)
+                return 1
+            print("批量构建的输出与单独构建一致")
+            return 0
+        case "codegen":
+            mismatches = codegen.run()
+            for line in mismatches:
+                print(line, file=sys.stderr)
+            if mismatches:
+                print("生成的命令与预期不一致", file=sys.stderr)
+                return 1
+            print(f"{len(codegen.CASES)} 个用例生成的命令与预期一致")
+            return 0
+        case "watch":
+            mismatches = watch_rebuild.run()
+            for line in mismatches:
+                print(line, file=sys.stderr)
+            if mismatches:
+                print("监视模式重新构建的输出与直接构建不一致", file=sys.stderr)
+                return 1
+            print("监视模式重新构建的输出与直接构建一致")
+            return 0
+    return 2
+
+
+sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+批量构建复用检查
+
+多个入口脚本导入同一个库模组，库模组中定义了 tick 函数和模组级的计分板项。通过 `pymcf build` 在常驻的工作进程中构建
+（之后的任务复用之前的任务已导入的库模组），再在新的解释器中分别单独构建每个脚本，两者输出的数据包应完全相同。
+
+    python -m benchmarks batch
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+from benchmarks.compile_time import ROOT
+
+LIBRARY = '''\
+from pymcf.mcfunction import mcfunction
+from pymcf.data import Score
+
+counter = Score("$counter", "tlib")
+
+
+@mcfunction.tick
+def lib_tick():
+    counter.__assign__(counter + 1)
+
+
+@mcfunction
+def lib_add(n: int):
+    counter.__assign__(counter + n)
+'''
+
+ENTRY = '''\
+from pymcf.project import Project
+from pymcf.mcfunction import mcfunction
+
+project = Project({name!r})
+import tlib
+
+
+@mcfunction.load
+def {name}_load():
+    tlib.lib_add({n})
+'''
+
+ENTRIES = ("a", "b", "c")
+
+
+def build(work_dir: Path, out: Path, entries: list[str], workers: int):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT / "src"), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-m", "pymcf", "build", *entries, "-w", str(workers), "-o", str(out / "packs"),
+         "-c", f"prj_tmp_dir={out / 'tmp'}", "-c", f"prj_cache_dir={out / 'cache'}"],
+        cwd=work_dir, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(entries)} 构建失败\n{proc.stderr}")
+
+
+def read_pack(path: Path) -> dict[str, bytes]:
+    with zipfile.ZipFile(path) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+def compare_packs(name: str, expected: dict[str, bytes], actual: dict[str, bytes]) -> list[str]:
+    res = [f"{name}: 缺少 {f}" for f in sorted(expected.keys() - actual.keys())]
+    res += [f"{name}: 多出 {f}" for f in sorted(actual.keys() - expected.keys())]
+    res += [f"{name}: {f} 内容不同" for f in sorted(expected.keys() & actual.keys()) if expected[f] != actual[f]]
+    return res
+
+
+def run(workers: tuple[int, ...] = (1, 2)) -> list[str]:
+    """
+    :param workers: 批量构建使用的工作进程数，每个工作进程数分别检查一次
+    :return: 与单独构建不一致之处，全部一致时为空
+    """
+    with tempfile.TemporaryDirectory(prefix="pymcf_batch_") as tmp:
+        work_dir = Path(tmp)
+        (work_dir / "tlib.py").write_text(LIBRARY, encoding="utf-8")
+        scripts = []
+        for n, name in enumerate(ENTRIES, 1):
+            (work_dir / f"{name}.py").write_text(ENTRY.format(name=name, n=n), encoding="utf-8")
+            scripts.append(f"{name}.py")
+
+        expected = {}
+        for name, script in zip(ENTRIES, scripts):
+            out = work_dir / "alone" / name
+            build(work_dir, out, [script], 1)
+            expected[name] = read_pack(out / "packs" / f"{name}.zip")
+
+        res = []
+        for w in workers:
+            out = work_dir / f"batch_{w}"
+            build(work_dir, out, scripts, w)
+            for name in ENTRIES:
+                res += compare_packs(f"-w {w} {name}", expected[name], read_pack(out / "packs" / f"{name}.zip"))
+        return res
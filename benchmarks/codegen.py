@@ -0,0 +1,137 @@
+"""
+生成代码检查
+
+以默认配置构建固定的小脚本，检查指定函数生成的命令与预期完全相同，用于防止优化导致的错误编译。
+
+    python -m benchmarks codegen
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.compile_time import ROOT
+from benchmarks.quality import Datapack
+
+
+class Case:
+    """
+    检查用例
+
+    source: 入口脚本，其中创建的 Project 名称应与 name 相同
+    expected: 函数名 -> 预期的命令（不含空行和注释）
+    """
+
+    def __init__(self, name: str, source: str, expected: dict[str, list[str]], description: str):
+        self.name = name
+        self.source = source
+        self.expected = expected
+        self.description = description
+
+    def __repr__(self):
+        return f"Case({self.name!r})"
+
+
+CASES: list[Case] = [
+    Case(
+        "raw_text_score",
+        '''\
+from pymcf.project import Project
+from pymcf.mcfunction import mcfunction
+from pymcf.data import Score
+from pymcf.text import text_component
+
+project = Project("raw_text_score")
+a = Score("$a", "test")
+
+
+@mcfunction.load
+def show():
+    b = a + 5
+    f'tellraw @a {text_component(b)}'
+''',
+        {
+            "raw_text_score:show": [
+                "scoreboard players operation $var_a7dd12b1_0 __sys__ = $a test",
+                "scoreboard players add $var_a7dd12b1_0 __sys__ 5",
+                'tellraw @a {"score":{"name":"$var_a7dd12b1_0","objective":"__sys__"}}',
+            ],
+        },
+        "只在 Raw 的文本组件中读取的局部变量，赋值不能被删除，槽位不能被复用",
+    ),
+    Case(
+        "const_multiply",
+        '''\
+from pymcf.project import Project
+from pymcf.mcfunction import mcfunction
+from pymcf.data import Score
+
+project = Project("const_multiply")
+a = Score("$a", "test")
+b = Score("$b", "test")
+
+
+@mcfunction.load
+def times3():
+    a.__assign__(a * 3)
+
+
+@mcfunction.load
+def negate():
+    b.__assign__(b * -1)
+''',
+        {
+            "const_multiply:times3": [
+                "scoreboard players operation $tmp __sys__ = $a test",
+                "scoreboard players operation $a test += $a test",
+                "scoreboard players operation $a test += $tmp __sys__",
+            ],
+            "const_multiply:negate": [
+                "scoreboard players set $tmp __sys__ 0",
+                "execute store result score $b test run scoreboard players operation $tmp __sys__ -= $b test",
+            ],
+            "const_multiply:__init__/scoreboard": [
+                "scoreboard objectives add test dummy",
+                "scoreboard objectives add __sys__ dummy",
+                "scoreboard players set $bf __sys__ 0",
+            ],
+        },
+        "默认配置下乘 3 和乘 -1 展开，不初始化 $const 计分板项",
+    ),
+]
+
+
+def _build(work_dir: Path, entries: list[str]):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT / "src"), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-m", "pymcf", "build", *entries, "-w", "1", "-o", str(work_dir / "packs"),
+         "-c", f"prj_tmp_dir={work_dir / 'tmp'}", "-c", f"prj_cache_dir={work_dir / 'cache'}"],
+        cwd=work_dir, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(entries)} 构建失败\n{proc.stdout}{proc.stderr}")
+
+
+def run(cases: list[Case] = CASES) -> list[str]:
+    """
+    :return: 与预期不一致之处，全部一致时为空
+    """
+    with tempfile.TemporaryDirectory(prefix="pymcf_codegen_") as tmp:
+        work_dir = Path(tmp)
+        for case in cases:
+            (work_dir / f"{case.name}.py").write_text(case.source, encoding="utf-8")
+        _build(work_dir, [f"{case.name}.py" for case in cases])
+
+        res = []
+        for case in cases:
+            pack = Datapack(work_dir / "packs" / f"{case.name}.zip")
+            for function, expected in case.expected.items():
+                actual = pack.functions.get(function)
+                if actual is None:
+                    res.append(f"{case.name}: 缺少函数 {function}")
+                elif actual != expected:
+                    res.append(f"{case.name}: {function} 与预期不同（{case.description}）\n"
+                               f"  预期：{expected}\n  实际：{actual}")
+        return res
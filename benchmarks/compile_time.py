@@ -0,0 +1,140 @@
+"""
+编译耗时基准测试
+
+每个场景的每次运行都在新的解释器中执行，避免 ast 改写结果等进程内缓存影响计时。各构建阶段的耗时由
+pymcf.profiler 记录（关闭内存记录），结果写入 JSON 文件，可以与其他提交的结果比较。
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Iterable
+
+from benchmarks.scenarios import SCENARIOS, Scenario
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 结果中记录的阶段，construct 包含 reform_func，compile 包含 expand、simplify 和 translate
+PHASES = ("reform_func", "construct", "locals", "compile", "expand", "simplify.empty", "simplify.inline", "constants", "coalesce", "dead_store", "slots", "translate", "output")
+
+
+def run_script(script: Path, work_dir: Path) -> dict:
+    """
+    在当前进程中构建脚本，返回各阶段耗时
+    """
+    from pymcf.batch import run_entry
+    from pymcf.session import BuildSession
+
+    config = {
+        "prj_profile": True,
+        "prj_profile_memory": False,
+        "prj_tmp_dir": work_dir / "tmp",
+        "prj_install_dir": work_dir / "out",
+        "prj_cache_dir": work_dir / "cache",
+    }
+    start = time.perf_counter()
+    with BuildSession(config) as session, open(os.devnull, "wt") as devnull, redirect_stdout(devnull):
+        project = run_entry(script)
+        records = project.profiler.to_json()
+        scopes = len(session.scopes)
+    return {
+        "wall": time.perf_counter() - start,
+        "total": records["total_time"],
+        "scopes": scopes,
+        "phases": {name: stat["time"] for name, stat in records["phases"].items()},
+    }
+
+
+def run_isolated(script: Path, work_dir: Path) -> dict:
+    """
+    在新的解释器中构建脚本，输出写入 work_dir / "out"
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), str(ROOT / "src"), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks", "_run", str(script), str(work_dir)],
+        cwd=work_dir, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script.stem} 构建失败\n{proc.stderr}")
+    return json.loads(proc.stdout)
+
+
+def _summary(values: list[float]) -> dict:
+    return {"min": min(values), "median": statistics.median(values)}
+
+
+def bench(scenario: Scenario, repeat: int = 3, scale: float = 1.0) -> dict:
+    """
+    运行一个场景 repeat 次，返回各阶段耗时的最小值和中位数
+    """
+    with tempfile.TemporaryDirectory(prefix=f"pymcf_bench_{scenario.name}_") as tmp:
+        work_dir = Path(tmp)
+        script = work_dir / f"{scenario.name}.py"
+        script.write_text(scenario.source(scale), encoding="utf-8")
+        runs = [run_isolated(script, work_dir) for _ in range(repeat)]
+    return {
+        "size": max(1, round(scenario.size * scale)),
+        "scopes": runs[0]["scopes"],
+        "wall": _summary([r["wall"] for r in runs]),
+        "total": _summary([r["total"] for r in runs]),
+        "phases": {
+            name: _summary([r["phases"].get(name, 0.0) for r in runs])
+            for name in PHASES
+        },
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names: Iterable[str] | None = None, repeat: int = 3, scale: float = 1.0) -> dict:
+    """
+    运行场景并汇总结果，names 为 None 时运行全部场景
+    """
+    names = list(names) if names else list(SCENARIOS)
+    results = {}
+    for name in names:
+        results[name] = bench(SCENARIOS[name], repeat, scale)
+        print(f"{name:<20}{results[name]['total']['median']:>10.3f}s", file=sys.stderr)
+    return {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "scale": scale,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[str, list[str]]:
+    """
+    按总耗时的中位数比较两次结果
+    :return: 比较表格，以及变慢超过 threshold 倍的场景
+    """
+    lines = [f"{'scenario':<20}{'baseline(s)':>12}{'current(s)':>12}{'ratio':>8}"]
+    regressed = []
+    for name, res in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None or base["size"] != res["size"]:
+            lines.append(f"{name:<20}{'-':>12}{res['total']['median']:>12.3f}{'-':>8}")
+            continue
+        ratio = res["total"]["median"] / base["total"]["median"]
+        lines.append(f"{name:<20}{base['total']['median']:>12.3f}{res['total']['median']:>12.3f}{ratio:>8.2f}")
+        if ratio > threshold:
+            regressed.append(name)
+    return "\n".join(lines), regressed
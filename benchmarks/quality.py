@@ -0,0 +1,151 @@
+"""
+生成代码质量基准测试
+
+构建固定的场景集合，统计输出数据包的规模：
+
+files: mcfunction 文件数
+commands: 命令总数
+hot_path: 入口函数（有 tick 函数时为 tick，否则为 load）执行一次时最长执行路径上的命令数，循环和递归只展开一次
+score_slots: 使用的假名（以 $ 开头）计分板项数
+storage_slots: 使用的 storage nbt 路径数
+
+结果与仓库中的基准（quality_baseline.json）比较，任一指标超过基准的 1 + threshold 倍时视为退化。
+"""
+import json
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Iterable
+
+from benchmarks.compile_time import run_isolated
+from benchmarks.scenarios import SCENARIOS, Scenario
+
+BASELINE = Path(__file__).resolve().parent / "quality_baseline.json"
+
+METRICS = ("files", "commands", "hot_path", "score_slots", "storage_slots")
+
+_FUNCTION = re.compile(r"^data/([^/]+)/function/(.+)\.mcfunction$")
+_TAG = re.compile(r"^data/([^/]+)/tags/function/(.+)\.json$")
+_CALL = re.compile(r"\bfunction (#?[\w.\-]+:[\w./\-]+)")
+_SCORE = re.compile(r"(?<!\S)(\$[^\s\[\]]+) ([^\s\[\]]+)")
+_STORAGE = re.compile(r"\bstorage (\S+) (\S+)")
+
+
+class Datapack:
+    """
+    从数据包 zip 中读取的函数和函数标签
+    """
+
+    def __init__(self, path: Path):
+        self.functions: dict[str, list[str]] = {}
+        self.tags: dict[str, list[str]] = {}
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                if m := _FUNCTION.match(name):
+                    text = zf.read(name).decode("utf-8")
+                    self.functions[f"{m[1]}:{m[2]}"] = [
+                        line for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")
+                    ]
+                elif m := _TAG.match(name):
+                    self.tags[f"{m[1]}:{m[2]}"] = json.loads(zf.read(name))["values"]
+
+    def resolve(self, ref: str) -> list[str]:
+        """
+        将函数或函数标签展开为函数列表
+        """
+        if not ref.startswith("#"):
+            return [ref] if ref in self.functions else []
+        return [f for value in self.tags.get(ref[1:], []) for f in self.resolve(value)]
+
+    def entrances(self) -> list[str]:
+        return self.resolve("#minecraft:tick") or self.resolve("#minecraft:load")
+
+    def hot_path(self) -> int:
+        costs: dict[str, int] = {}
+        active: set[str] = set()  # 调用栈上的函数，再次调用时视为循环或递归，不展开
+
+        # 调用链可能很深，使用显式栈后序计算
+        for entrance in self.entrances():
+            stack = [(entrance, None)]
+            while stack:
+                func, callees = stack.pop()
+                if callees is None:
+                    if func in costs or func in active:
+                        continue
+                    active.add(func)
+                    callees = [
+                        callee for line in self.functions[func] for ref in _CALL.findall(line)
+                        for callee in self.resolve(ref)
+                    ]
+                    stack.append((func, callees))
+                    stack.extend((callee, None) for callee in callees if callee not in active and callee not in costs)
+                else:
+                    active.discard(func)
+                    costs[func] = self._longest_path(func, costs)
+        return sum(costs[func] for func in self.entrances())
+
+    def _longest_path(self, func: str, costs: dict[str, int]) -> int:
+        """
+        函数执行一次时最长的执行路径：条件返回的命令分别考虑返回和继续执行两种情况，其余条件命令视为总是执行
+        """
+        best = 0
+        executed = 0
+        for line in self.functions[func]:
+            executed += 1 + sum(costs.get(callee, 0) for ref in _CALL.findall(line) for callee in self.resolve(ref))
+            if line.startswith("return"):
+                return max(best, executed)
+            if " run return" in line:
+                best = max(best, executed)
+                executed -= sum(  # 条件不成立时不执行其中的调用
+                    costs.get(callee, 0) for ref in _CALL.findall(line) for callee in self.resolve(ref)
+                )
+        return max(best, executed)
+
+    def metrics(self) -> dict[str, int]:
+        lines = [line for cmds in self.functions.values() for line in cmds]
+        return {
+            "files": len(self.functions),
+            "commands": len(lines),
+            "hot_path": self.hot_path(),
+            "score_slots": len({pair for line in lines for pair in _SCORE.findall(line)}),
+            "storage_slots": len({pair for line in lines for pair in _STORAGE.findall(line)}),
+        }
+
+
+def measure(scenario: Scenario) -> dict[str, int]:
+    with tempfile.TemporaryDirectory(prefix=f"pymcf_quality_{scenario.name}_") as tmp:
+        work_dir = Path(tmp)
+        script = work_dir / f"{scenario.name}.py"
+        script.write_text(scenario.source(), encoding="utf-8")
+        run_isolated(script, work_dir)
+        (path, ) = (work_dir / "out").glob("*.zip")
+        return Datapack(path).metrics()
+
+
+def run(names: Iterable[str] | None = None) -> dict[str, dict[str, int]]:
+    names = list(names) if names else list(SCENARIOS)
+    return {name: measure(SCENARIOS[name]) for name in names}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[str, list[str]]:
+    """
+    :return: 比较表格，以及退化的 场景.指标
+    """
+    lines = [f"{'scenario':<20}{'metric':<16}{'baseline':>10}{'current':>10}{'change':>9}"]
+    regressed = []
+    for name, metrics in current.items():
+        base = baseline.get(name, {})
+        for metric in METRICS:
+            value = metrics[metric]
+            if metric not in base:
+                lines.append(f"{name:<20}{metric:<16}{'-':>10}{value:>10}{'-':>9}")
+                continue
+            old = base[metric]
+            change = (value - old) / old if old else (0.0 if value == old else float("inf"))
+            mark = ""
+            if value > old * (1 + threshold):
+                regressed.append(f"{name}.{metric}")
+                mark = " !"
+            lines.append(f"{name:<20}{metric:<16}{old:>10}{value:>10}{change:>+9.1%}{mark}")
+    return "\n".join(lines), regressed
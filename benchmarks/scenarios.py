@@ -0,0 +1,212 @@
+"""
+基准测试场景
+
+每个场景由生成器按规模生成一个完整的 pymcf 构建脚本（创建 Project、定义函数并调用 build）。
+"""
+import re
+from pathlib import Path
+from typing import Callable
+
+README = Path(__file__).resolve().parent.parent / "README.md"
+
+_HEADER = '''\
+from pymcf.project import Project
+from pymcf.mcfunction import mcfunction
+from pymcf.data import Score, Nbt, NbtInt
+from pymcf.exceptions import RtExc
+
+project = Project("{name}")
+'''
+
+
+class Scenario:
+    """
+    基准测试场景
+
+    generate: 由规模生成构建脚本源码
+    size: 默认规模
+    """
+
+    def __init__(self, name: str, generate: Callable[[int], str], size: int, description: str):
+        self.name = name
+        self.generate = generate
+        self.size = size
+        self.description = description
+
+    def source(self, scale: float = 1.0) -> str:
+        return self.generate(max(1, round(self.size * scale)))
+
+    def __repr__(self):
+        return f"Scenario({self.name!r})"
+
+
+def _indent(lines: list[str], level: int = 1) -> list[str]:
+    return ["    " * level + line if line else line for line in lines]
+
+
+def many_functions(n: int) -> str:
+    """
+    大量小函数，互相之间有少量调用
+    """
+    lines = [_HEADER.format(name="many_functions")]
+    for i in range(n):
+        lines.append("@mcfunction")
+        lines.append(f"def f{i}(x: Score) -> Score:")
+        lines.append(f"    y = x + {i}")
+        if i % 5:
+            lines.append(f"    y = f{i - 1}(y)")
+        lines.append(f"    if y > {i * 3}:")
+        lines.append(f"        y -= {i}")
+        lines.append("    return y\n\n")
+    lines.append("@mcfunction.load")
+    lines.append("def load():")
+    lines.append("    a = Score(0)")
+    lines.extend(f"    a = f{i}(a)" for i in range(4, n, 5))
+    lines.append("    f'say {a}'")
+    lines.append("\n\nproject.build()")
+    return "\n".join(lines) + "\n"
+
+
+def _nested(depth: int, level: int) -> list[str]:
+    if level == depth:
+        return ["x += 1", "if x > y:", "    raise Err()"]
+    inner = _nested(depth, level + 1)
+    match level % 3:
+        case 0:
+            return [f"if x > {level}:", *_indent(inner), "else:", f"    y += {level}"]
+        case 1:
+            return ["while y < x:", "    y += 1", *_indent(inner)]
+        case _:
+            return ["try:", *_indent(inner), "except Err:", f"    y -= {level}"]
+
+
+NESTING_DEPTH = 8  # ast 改写后的函数仍需满足 python 的静态嵌套层数限制（20）
+
+
+def deep_nesting(n: int) -> str:
+    """
+    n 个函数，每个函数中 if / while / try 嵌套 NESTING_DEPTH 层
+    """
+    lines = [_HEADER.format(name="deep_nesting")]
+    lines.append("class Err(RtExc):\n    pass\n\n")
+    for k in range(n):
+        lines.append("@mcfunction")
+        lines.append(f"def nest{k}(x: Score, y: Score):")
+        lines.extend(_indent(["try:", *_indent(_nested(NESTING_DEPTH + k % 3, k % 3)), "except Err:", "    x = 0"]))
+        lines.append("\n")
+    lines.append("@mcfunction.load")
+    lines.append("def load():")
+    lines.append("    a = Score(0)")
+    lines.append("    b = Score(0)")
+    lines.extend(f"    nest{k}(a, b)" for k in range(n))
+    lines.append("\n\nproject.build()")
+    return "\n".join(lines) + "\n"
+
+
+def unrolled_loop(n: int) -> str:
+    """
+    大型编译期循环展开
+    """
+    return _HEADER.format(name="unrolled_loop") + f'''
+
+@mcfunction.load
+def load():
+    a = Score(5)
+    b = Score(0)
+    for _i in range({n}):
+        if a > _i:
+            b += _i
+            if b > 100:
+                b -= 7
+        elif a == _i:
+            b *= 2
+        else:
+            b -= 1
+    f'say {{b}}'
+
+
+project.build()
+'''
+
+
+def many_exceptions(n: int) -> str:
+    """
+    大量运行期异常类及其抛出和捕获
+    """
+    lines = [_HEADER.format(name="many_exceptions")]
+    lines.append("class BaseErr(RtExc):\n    pass\n\n")
+    for i in range(n):
+        base = f"Err{i // 4 * 4}" if i % 4 else "BaseErr"
+        lines.append(f"class Err{i}({base}):\n    pass\n\n")
+    lines.append("@mcfunction")
+    lines.append("def check(x: Score):")
+    for i in range(n):
+        lines.append(f"    if x == {i}:")
+        lines.append(f"        raise Err{i}()")
+    lines.append("\n")
+    for i in range(0, n, 4):
+        lines.append("@mcfunction")
+        lines.append(f"def guard{i}(x: Score) -> Score:")
+        lines.append("    r = Score(0)")
+        lines.append("    try:")
+        lines.append("        check(x)")
+        lines.append(f"    except Err{i}:")
+        lines.append("        r = 1")
+        lines.append("    except BaseErr:")
+        lines.append("        r = 2")
+        lines.append("    return r\n\n")
+    lines.append("@mcfunction.load")
+    lines.append("def load():")
+    lines.append("    a = Score(0)")
+    lines.extend(f"    a += guard{i}(a)" for i in range(0, n, 4))
+    lines.append("\n\nproject.build()")
+    return "\n".join(lines) + "\n"
+
+
+def arithmetic(n: int) -> str:
+    """
+    大量 Score 和 Nbt 运算
+    """
+    return _HEADER.format(name="arithmetic") + f'''
+
+@mcfunction.load
+def load():
+    a = Score(3)
+    b = Score(7)
+    c = Score(0)
+    for _i in range({n}):
+        v = Nbt("bench:data", f"values[{{_i % 16}}]", shema=NbtInt)
+        c = a * b + c - _i
+        c = c % 1000 + (a + _i) * 3 // 2
+        a = Score(v)
+        v = c + b
+        if c > a * 2:
+            b += c - a
+    f'say {{c}}'
+
+
+project.build()
+'''
+
+
+def game_of_life(_size: int) -> str:
+    """
+    README 中的康威生命游戏示例，规模不影响生成结果
+    """
+    text = README.read_text(encoding="utf-8")
+    match = re.search(r"^```python3\n(.*?)^```", text, re.MULTILINE | re.DOTALL)
+    if match is None:
+        raise ValueError(f"{README} 中没有找到示例代码")
+    return match.group(1)
+
+
+SCENARIOS: dict[str, Scenario] = {
+    s.name: s for s in [
+        Scenario("many_functions", many_functions, 300, "300 个小函数"),
+        Scenario("deep_nesting", deep_nesting, 40, f"40 个 {NESTING_DEPTH} 层 if / while / try 嵌套的函数"),
+        Scenario("unrolled_loop", unrolled_loop, 1000, "展开 1000 次的编译期循环"),
+        Scenario("many_exceptions", many_exceptions, 120, "120 个运行期异常类"),
+        Scenario("arithmetic", arithmetic, 300, "300 组 Score 和 Nbt 运算"),
+        Scenario("game_of_life", game_of_life, 1, "README 中的生命游戏示例"),
+    ]
+}
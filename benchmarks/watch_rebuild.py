@@ -0,0 +1,115 @@
+"""
+监视模式重新构建检查
+
+入口脚本导入定义了运行期异常类的库模组。在监视模式中构建后修改库模组并重新构建，输出的数据包应与在新的解释器中
+直接构建修改后的源码完全相同（包括异常编号）。
+
+    python -m benchmarks watch
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.batch_reuse import build, compare_packs, read_pack
+from benchmarks.compile_time import ROOT
+
+LIBRARY = '''\
+from pymcf.mcfunction import mcfunction
+from pymcf.data import Score
+from pymcf.exceptions import RtExc
+
+
+class MyErr(RtExc):
+    pass
+
+
+class OtherErr(RtExc):
+    pass
+
+
+@mcfunction
+def check(x: Score) -> Score:
+    if x > 10:
+        raise MyErr()
+    if x < -10:
+        raise OtherErr()
+    return x + 1
+'''
+
+ENTRY = '''\
+from pymcf.project import Project
+from pymcf.mcfunction import mcfunction
+from pymcf.data import Score
+
+project = Project("wlib")
+import tlib
+
+inp = Score("$in", "test")
+
+
+@mcfunction.load
+def load():
+    r = Score(0)
+    try:
+        r = tlib.check(inp)
+    except tlib.MyErr:
+        r = 100
+    except tlib.OtherErr:
+        r = -1
+    inp.__assign__(r)
+'''
+
+
+def _edit(work_dir: Path):
+    path = work_dir / "tlib.py"
+    path.write_text(path.read_text(encoding="utf-8").replace("x + 1", "x + 2"), encoding="utf-8")
+
+
+def rebuild(work_dir: Path, out: Path):
+    """
+    在当前进程中以监视模式构建，修改库模组后重新构建一次
+    """
+    from pymcf.watch import Watcher
+
+    errors = []
+    config = {
+        "prj_incremental": True,
+        "prj_install_dir": out / "packs",
+        "prj_tmp_dir": out / "tmp",
+        "prj_cache_dir": out / "cache",
+    }
+    os.chdir(work_dir)
+    sys.path.insert(0, str(work_dir))
+    with Watcher("main.py", config, on_build=lambda changed, elapsed, error: errors.append(error)) as watcher:
+        watcher.build()
+        _edit(work_dir)
+        watcher.build([str(work_dir / "tlib.py")])
+    for error in errors:
+        if error is not None:
+            raise RuntimeError(error)
+
+
+def run() -> list[str]:
+    """
+    :return: 重新构建的输出与直接构建不一致之处，全部一致时为空
+    """
+    with tempfile.TemporaryDirectory(prefix="pymcf_watch_") as tmp:
+        work_dir = Path(tmp)
+        (work_dir / "tlib.py").write_text(LIBRARY, encoding="utf-8")
+        (work_dir / "main.py").write_text(ENTRY, encoding="utf-8")
+
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), str(ROOT / "src"), env.get("PYTHONPATH")]))
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks", "_watch", str(work_dir), str(work_dir / "watch")],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"监视模式构建失败\n{proc.stdout}{proc.stderr}")
+
+        out = work_dir / "cold"
+        build(work_dir, out, ["main.py"], 1)
+        return compare_packs("wlib", read_pack(out / "packs" / "wlib.zip"),
+                             read_pack(work_dir / "watch" / "packs" / "wlib.zip"))
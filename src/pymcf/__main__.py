@@ -0,0 +1,5 @@
+import sys
+
+from pymcf.cli import main
+
+sys.exit(main())
@@ -2,7 +2,6 @@ import ast
 from abc import ABC, abstractmethod, ABCMeta
 from ast import AST as _AST, unaryop, UAdd, USub, Not, Invert, boolop, And, Or, operator, Add, Sub, Mult, Div, FloorDiv, Mod, \
     Pow, LShift, RShift, BitOr, BitXor, BitAnd, MatMult, Is, IsNot, In, NotIn
-from functools import reduce
 from types import GenericAlias
 from typing import Any, Iterable, Self, Literal
 
@@ -41,32 +40,45 @@ class cached_property:
                 f"instance to cache {self.attrname!r} property."
             )
             raise TypeError(msg) from None
-        val = cache.get(self.attrname, _NOT_FOUND)
+        # 缓存按需创建：无缓存时为 None，只有一项时为 (name, value)，多于一项时为 dict
+        name = self.attrname
+        if cache is None:
+            val = _NOT_FOUND
+        elif type(cache) is tuple:
+            val = cache[1] if cache[0] == name else _NOT_FOUND
+        else:
+            val = cache.get(name, _NOT_FOUND)
         if val is _NOT_FOUND:
             val = self.func(instance)
-            try:
-                cache[self.attrname] = val
-            except TypeError:
-                msg = (
-                    f"The '_cache' attribute on {type(instance).__name__!r} instance "
-                    f"does not support item assignment for caching {self.attrname!r} property."
-                )
-                raise TypeError(msg) from None
+            cache = instance._cache  # func 中可能写入了其他缓存项
+            if cache is None:
+                instance._cache = (name, val)
+            elif type(cache) is tuple:
+                instance._cache = {cache[0]: cache[1], name: val}
+            else:
+                cache[name] = val
         return val
 
     __class_getitem__ = classmethod(GenericAlias)
 
 
 class AST(_AST):
+    """
+    语句树节点
+
+    节点类通过 __slots__ 声明 __init__ 中设置的属性，避免为每个节点创建 __dict__。
+    """
+    __slots__ = ("_cache", )
 
     def __init__(self):
-        self._cache = {}
+        self._cache: tuple[str, Any] | dict[str, Any] | None = None
 
     def clear_cache(self):
-        self._cache.clear()
+        self._cache = None
 
 
 class stmt(AST):
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -84,6 +96,7 @@ class stmt(AST):
 
 
 class Block(AST):
+    __slots__ = ("flow", )
     _fields = ("flow",)
 
     def __init__(self, flow: Iterable[stmt] = None):
@@ -93,10 +106,10 @@ class Block(AST):
     @cached_property
     def excs(self) -> ExcSet:
         if self.flow:
-            s = reduce(lambda a, b: a | b, (st.excs.types for st in self.flow), set())
+            excs = ExcSet.union(st.excs for st in self.flow)
             if self.flow[-1].excs.always:
-                s.discard(None)  # 若 flow 最后一个语句一定引发异常，则整个 block 必然引发异常
-            return ExcSet(s)
+                excs = excs.remove({None})  # 若 flow 最后一个语句一定引发异常，则整个 block 必然引发异常
+            return excs
         else:
             return ExcSet.EMPTY
 
@@ -105,6 +118,7 @@ class compiler_hint(stmt, ABC):
     """
     compiler_hint 用于提示编译器调整编译策略
     """
+    __slots__ = ()
     excs = ExcSet.EMPTY
 
 
@@ -112,6 +126,7 @@ class operation(stmt, ABC):
     """
     operation 不会改变控制流，也不包含控制流
     """
+    __slots__ = ()
     _reads = ()
     _writes = ()
     excs = ExcSet.EMPTY
@@ -139,6 +154,7 @@ class control_flow(stmt, ABC):
     """
     control_flow 实现控制流语句
     """
+    __slots__ = ()
 
 
 class Resolvable(metaclass=ABCMeta):
@@ -174,6 +190,7 @@ class FormattedData(Resolvable):
 
 
 class Raw(operation):
+    __slots__ = ("code",)
     _fields = ("code",)
     def __init__(self, *code: str | Resolvable, **kwargs):
         self.code = code
@@ -185,6 +202,7 @@ class Raw(operation):
 
 
 class Assign(operation):
+    __slots__ = ("target", "value")
     _fields = ("target", "value")
     _reads = ("value",)
     _writes = ("target",)
@@ -195,6 +213,7 @@ class Assign(operation):
 
 
 class UnaryOp(operation):
+    __slots__ = ("op", "target", "value")
     _fields = ("op", "target", "value")
     _reads = ("value",)
     _writes = ("target",)
@@ -225,6 +244,7 @@ class Inplace(operation):
     """
     target = target <op> value
     """
+    __slots__ = ("op", "target", "value")
     _fields = ("op", "target", "value")
     _reads = ("target", "value")
     _writes = ("target",)
@@ -296,6 +316,7 @@ class Inplace(operation):
 
 
 class cmpop(ast.cmpop):
+    __slots__ = ()
 
     @abstractmethod
     def opposite(self) -> Self: ...
@@ -326,6 +347,7 @@ class GtE(cmpop):
         return LtE()
 
 class Compare(operation):
+    __slots__ = ("op", "target", "left", "right")
     _fields = ("op", "target", "left", "right")
     _reads = ("left", "right")
     _writes = ("target",)
@@ -378,6 +400,7 @@ class Compare(operation):
 
 
 class If(control_flow):
+    __slots__ = ("condition", "blk_body", "blk_else")
     _fields = ("condition", "blk_body", "blk_else")
     def __init__(self, condition: Any, blk_body: Block, blk_else: Block, **kwargs):
         self.condition = condition
@@ -387,10 +410,11 @@ class If(control_flow):
 
     @cached_property
     def excs(self) -> ExcSet:
-        return ExcSet(self.blk_body.excs.types | self.blk_else.excs.types)
+        return self.blk_body.excs | self.blk_else.excs
 
 
 class For(control_flow):
+    __slots__ = ("iterator", "blk_iter", "blk_body", "blk_else")
     _fields = ("iterator", "blk_iter", "blk_body", "blk_else")
     def __init__(self, iterator: Any, blk_iter: Block, blk_body: Block, blk_else: Block, **kwargs):
         self.iterator = iterator
@@ -401,14 +425,15 @@ class For(control_flow):
 
     @cached_property
     def excs(self) -> ExcSet:
-        return ExcSet(
-            self.blk_iter.excs.remove(RtStopIteration).types |
-            self.blk_body.excs.remove({RtContinue, RtBreak}).types |
-            self.blk_else.excs.types
+        return (
+            self.blk_iter.excs.remove(RtStopIteration) |
+            self.blk_body.excs.remove({RtContinue, RtBreak}) |
+            self.blk_else.excs
         )
 
 
 class While(control_flow):
+    __slots__ = ("condition", "blk_cond", "blk_body", "blk_else")
     _fields = ("condition", "blk_cond", "blk_body", "blk_else")
     def __init__(self, condition: Any, blk_cond: Block, blk_body: Block, blk_else: Block, **kwargs):
         self.condition = condition
@@ -422,14 +447,15 @@ class While(control_flow):
         if self.blk_cond.excs.always:
             return self.blk_cond.excs
         else:
-            return ExcSet(
-                self.blk_cond.excs.types |
-                self.blk_body.excs.remove({RtContinue, RtBreak}).types |
-                self.blk_else.excs.types
+            return (
+                self.blk_cond.excs |
+                self.blk_body.excs.remove({RtContinue, RtBreak}) |
+                self.blk_else.excs
             )
 
 
 class Call(control_flow):
+    __slots__ = ("func",)
     _fields = ("func",)
     def __init__(self, func: Any, **kwargs):
         self.func = func
@@ -448,6 +474,7 @@ class Call(control_flow):
 
 
 class ExcHandle(AST):
+    __slots__ = ("eg", "blk_handle")
     _fields = ("eg", "blk_handle")
     def __init__(self, eg: tuple[_TBaseRtExc], blk_handle: Block):
         self.eg = eg
@@ -455,6 +482,7 @@ class ExcHandle(AST):
 
 
 class Try(control_flow):
+    __slots__ = ("blk_try", "excepts", "blk_else", "blk_finally")
     _fields = ("blk_try", "excepts", "blk_else", "blk_finally")
     def __init__(self, blk_try: Block, excepts: list[ExcHandle], blk_else: Block, blk_finally: Block, **kwargs):
         self.blk_try = blk_try
@@ -469,20 +497,13 @@ class Try(control_flow):
             return self.blk_finally.excs
         else:
             excs = self.blk_try.excs
-            handler_excs = set()
+            handler_excs = []
             for handler in self.excepts:
                 excs = excs.remove_subclasses(handler.eg)
-                for e in self.blk_try.excs.types:
-                    if e is not None and issubclass(e, handler.eg):
-                        # handler 将被启用，记录其异常
-                        handler_excs.update(handler.blk_handle.excs.types)
-                        break
-            return ExcSet(
-                excs.types |
-                handler_excs |
-                self.blk_else.excs.types |
-                self.blk_finally.excs.types
-            )
+                if self.blk_try.excs.has_subclasses(handler.eg):
+                    # handler 将被启用，记录其异常
+                    handler_excs.append(handler.blk_handle.excs)
+            return ExcSet.union((excs, *handler_excs, self.blk_else.excs, self.blk_finally.excs))
 
 
 class Raise(control_flow):
@@ -493,6 +514,7 @@ class Raise(control_flow):
 
     exc 是异常实例。
     """
+    __slots__ = ("exc",)
     _fields = ("exc",)
     def __init__(self, exc: RtBaseExc, **kwargs):
         assert isinstance(exc, RtBaseExc)
@@ -505,6 +527,7 @@ class Raise(control_flow):
 
 
 class With(control_flow):
+    __slots__ = ("ctx", "blk_enter", "blk_body", "blk_exit")
     _fields = ("ctx", "blk_enter", "blk_body", "blk_exit")
     def __init__(self, ctx, blk_enter: Block,  blk_body: Block, blk_exit: Block, **kwargs):
         self.ctx = ctx
@@ -519,8 +542,4 @@ class With(control_flow):
             return self.blk_enter.excs
         if self.blk_exit.excs.always:
             return self.blk_exit.excs
-        return ExcSet(
-            self.blk_body.excs.types |
-            self.blk_enter.excs.types |
-            self.blk_exit.excs.types
-        )
\ No newline at end of file
+        return self.blk_body.excs | self.blk_enter.excs | self.blk_exit.excs
\ No newline at end of file
@@ -6,7 +6,7 @@ from types import FunctionType
 from typing import Any, Union, Mapping
 
 from . import Constructor, Block, FormattedData, Resolvable
-from . import syntactic
+from . import syntactic, code_cache, source_index
 from .runtime import *
 
 
@@ -1197,7 +1197,8 @@ class ASTRewriter(NodeTransformer):
         else:
             return node
 
-    def assign_handler(self, target, value):
+    @staticmethod
+    def assign_handler(target, value):
         if isinstance(target, RtBaseVar):
             target.__assign__(value)
             return True
@@ -1324,27 +1325,28 @@ class ASTRewriter(NodeTransformer):
         """
         return Raise(exc=self.add_call(RtReturn, [node.value if node.value is not None else Constant(None)]))
 
+    @staticmethod
+    def handle_fmt_spec(data, fmt, conversion):
+        if isinstance(data, Resolvable):
+            return FormattedData(data, fmt, chr(conversion) if conversion != -1 else None)
+        else:
+            if fmt is not None:
+                data = format(data, fmt)
+            if conversion == ord('r'):
+                return repr(data)
+            if conversion == ord('a'):
+                return ascii(data)
+            if conversion == ord('s'):
+                return str(data)
+            else:
+                return str(data)
+
     def raw_handler(self, js: JoinedStr) -> expr:
         exps = []
 
-        def handle_fmt_spec(data, fmt, conversion):
-            if isinstance(data, Resolvable):
-                return FormattedData(data, fmt, chr(conversion) if conversion != -1 else None)
-            else:
-                if fmt is not None:
-                    data = format(data, fmt)
-                if conversion == ord('r'):
-                    return repr(data)
-                if conversion == ord('a'):
-                    return ascii(data)
-                if conversion == ord('s'):
-                    return str(data)
-                else:
-                    return str(data)
-
         for v in js.values:
             if isinstance(v, FormattedValue):
-                exps.append(self.add_call(handle_fmt_spec,  [v.value, (v.format_spec if v.format_spec is not None else Constant(None)), Constant(v.conversion)]))
+                exps.append(self.add_call(self.handle_fmt_spec,  [v.value, (v.format_spec if v.format_spec is not None else Constant(None)), Constant(v.conversion)]))
             else:
                 exps.append(v)
         return self.add_call(syntactic.Raw, exps)
@@ -1382,42 +1384,57 @@ class ASTRewriter(NodeTransformer):
         return super().generic_visit(node)
 
 
-def reform_func(func: types.FunctionType, wrapper_name: str = "$wrapper", remove_decorator: bool = True) -> types.FunctionType:
+def reform_func(func: types.FunctionType, wrapper_name: str = "$wrapper", remove_decorator: bool = True,
+                source: source_index.FunctionSource | None = None) -> types.FunctionType:
     """
     将 python 函数改造为 ast 生成器
 
     生成器调用参数与原函数相同，返回值为生成的 Context
-    """
-    lines, start_line = inspect.getsourcelines(func)
 
-    if lines[0].startswith((' ', '\t')):  # 判断函数定义是否存在整体缩进
-        """
-        不能随意删除缩进，否则可能导致多行字符串的内容发生改变。
-        此处将函数定义包裹在 if 内部使语法解析正确进行。
-        """
-        lines.insert(0, "if True:\n")
-        start_line -= 1
-        code = "".join(lines)
-        node = parse(code, mode='exec')
-        node = node.body[0].body[0]
+    :param source: 预先定位的函数源码，为 None 时在源码索引中查找
+    """
+    if source is None:
+        source = source_index.find_function(func)
+    if source is not None:
+        lines, start_line = source.lines, source.start_line
     else:
-        code = "".join(lines)
-        node = parse(code, mode='exec')
-        node = node.body[0]
-
-    node = increment_lineno(node, start_line - 1)
+        lines, start_line = inspect.getsourcelines(func)
     code = func.__code__
-    rewriter = ASTRewriter(wrapper_name=wrapper_name, remove_decorator=remove_decorator, co_freevars=code.co_freevars)
-    node = rewriter.rewrite(node)
-    node = fix_missing_locations(node)
+    filename = inspect.getfile(func)
+    key = code_cache.cache_key("".join(lines), filename, start_line, wrapper_name, remove_decorator, code.co_freevars)
+    cache_path = code_cache.cache_path(filename, func.__qualname__)
+
+    cached = code_cache.load(cache_path, key)
+    if cached is not None:
+        module_code, refs = cached
+        try:
+            nonlocals = {n: CellEmpty if ref is None else code_cache.from_ref(ref) for n, ref in refs.items()}
+        except (ImportError, AttributeError):
+            cached = None  # 注入的值所在的模组或名称已被修改，重新改写
+    if cached is None:
+        if source is not None:
+            node = source.take_node()
+        else:
+            node = source_index.parse_function(lines, start_line)
+        rewriter = ASTRewriter(wrapper_name=wrapper_name, remove_decorator=remove_decorator, co_freevars=code.co_freevars)
+        node = rewriter.rewrite(node)
+        node = fix_missing_locations(node)
+        module_code = compile(node, filename, 'exec')
+
+        nonlocals = rewriter.get_nonlocals()
+        try:
+            refs = {n: None if v is CellEmpty else code_cache.to_ref(v) for n, v in nonlocals.items()}
+        except ValueError:
+            pass
+        else:
+            code_cache.store(cache_path, key, module_code, refs)
 
     glb = func.__globals__
-    exec(compile(node, inspect.getfile(func), 'exec'), glb)
+    exec(module_code, glb)
     wrapper = glb[wrapper_name]
     del glb[wrapper_name]
     new_func: types.FunctionType = wrapper()
 
-    nonlocals = rewriter.get_nonlocals()
     new_code = new_func.__code__
     new_closure = []
     for i, n in enumerate(new_code.co_freevars):
@@ -0,0 +1,112 @@
+"""
+reform_func 改写结果的磁盘缓存
+
+与 __pycache__ 类似，缓存文件保存在源文件旁的 __pycache__ 目录中，每个函数一个文件，内容为改写后代码的
+code 对象和改写过程中注入的非局部值的引用。缓存键包含函数源码、所在位置、改写参数、改写器源码和解释器版本，
+任一项变化时缓存失效。读取缓存时注入的值按名称还原，所在的模组或名称被修改、删除而无法还原时同样视为缓存失效。
+"""
+import importlib
+import marshal
+import os
+import re
+import sys
+from hashlib import blake2b
+from importlib.util import MAGIC_NUMBER, cache_from_source
+from pathlib import Path
+from types import CodeType
+from typing import Any
+
+_FORMAT = 1
+_rewriter_digest: bytes | None = None
+# 决定改写结果的源文件：改写器本身，以及改写后的代码引用的语法结构和运行期辅助函数
+_REWRITER_SOURCES = ("ast_gen.py", "syntactic.py", "_syntactic.py", "runtime.py")
+
+type ValueRef = tuple[str, str] | None
+
+
+def rewriter_digest() -> bytes:
+    """
+    改写器版本标识，改写器（及改写后代码依赖的语法结构和运行期辅助函数）的源码或解释器版本变化时缓存失效
+    """
+    global _rewriter_digest
+    if _rewriter_digest is None:
+        h = blake2b(digest_size=16)
+        h.update(f"{_FORMAT}:{sys.version}\0".encode())
+        h.update(MAGIC_NUMBER)
+        for name in _REWRITER_SOURCES:
+            h.update(name.encode() + b"\0")
+            h.update(Path(__file__).with_name(name).read_bytes())
+        _rewriter_digest = h.digest()
+    return _rewriter_digest
+
+
+def cache_key(source: str, filename: str, start_line: int, wrapper_name: str, remove_decorator: bool, co_freevars: tuple[str, ...]) -> bytes:
+    h = blake2b(rewriter_digest(), digest_size=16)
+    h.update(repr((filename, start_line, wrapper_name, remove_decorator, co_freevars)).encode())
+    h.update(b"\0")
+    h.update(source.encode())
+    return h.digest()
+
+
+def cache_path(filename: str, qualname: str) -> Path | None:
+    """
+    :return: 函数对应的缓存文件路径，函数不来自源文件时返回 None
+    """
+    if not os.path.isfile(filename):
+        return None
+    try:
+        pyc = Path(cache_from_source(filename))
+    except (NotImplementedError, ValueError):
+        return None
+    name = re.sub(r"[^\w.\-]", "_", qualname)
+    return pyc.with_name(pyc.stem + ".pymcf") / f"{name}.bin"
+
+
+def to_ref(value: Any) -> ValueRef:
+    """
+    将改写器注入的值表示为 (模块名, 限定名)，无法通过名称还原时抛出 ValueError
+    """
+    module = getattr(value, "__module__", None)
+    qualname = getattr(value, "__qualname__", None)
+    if not isinstance(module, str) or not isinstance(qualname, str) or "<locals>" in qualname:
+        raise ValueError(value)
+    try:
+        resolved = from_ref((module, qualname))
+    except (ImportError, AttributeError):
+        raise ValueError(value)
+    if resolved is not value:
+        raise ValueError(value)
+    return module, qualname
+
+
+def from_ref(ref: tuple[str, str]) -> Any:
+    module, qualname = ref
+    value = importlib.import_module(module)
+    for attr in qualname.split("."):
+        value = getattr(value, attr)
+    return value
+
+
+def load(path: Path | None, key: bytes) -> tuple[CodeType, dict[str, ValueRef]] | None:
+    if path is None:
+        return None
+    try:
+        data = marshal.loads(path.read_bytes())
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+    if not isinstance(data, tuple) or len(data) != 3 or data[0] != key:
+        return None
+    _, code, refs = data
+    return code, dict(refs)
+
+
+def store(path: Path | None, key: bytes, code: CodeType, refs: dict[str, ValueRef]):
+    if path is None or sys.dont_write_bytecode:
+        return
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(marshal.dumps((key, code, tuple(refs.items()))))
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
@@ -2,6 +2,8 @@ import math
 from abc import abstractmethod, ABC, ABCMeta
 from typing import final, Self, Iterator, Iterable, SupportsInt
 
+from pymcf.session import current_session
+
 
 class _RtBaseExcMeta(ABCMeta):
     @property
@@ -138,8 +140,12 @@ class ExcSet:
     异常集合
 
     不可变集合，要修改内容需要创建新集合
+
+    集合以异常类注册表上的位掩码表示，异常类在第一次出现时注册；内容相同的集合是同一个实例。注册表属于当前构建会话。
     """
 
+    __slots__ = ("_mask", )
+
     EMPTY: Self
     """
     空异常集合，不含任何异常。
@@ -150,58 +156,158 @@ class ExcSet:
     满异常集合，可能出现任意 RtNormalExc 或无异常。用于描述异常未知的函数。
     """
 
-    def __init__(self, exc: _TBaseRtExc | Iterable[_TBaseRtExc] | Self | None):
-        self._types: set[_TBaseRtExc | None] = set()
+
+    def __new__(cls, exc: _TBaseRtExc | Iterable[_TBaseRtExc] | Self | None):
+        if isinstance(exc, ExcSet):
+            return exc
         if isinstance(exc, type):
-            self._types.add(exc)
+            mask = cls._bit(exc)
         elif isinstance(exc, RtBaseExc):
-            self._types.add(type(exc))
-        elif isinstance(exc, ExcSet):
-            self._types.update(exc._types)
+            mask = cls._bit(type(exc))
         elif exc is None:
-            self._types.add(exc)
+            mask = 1
         else:
             try:
-                self._types.update(exc)
+                mask = 0
+                for e in exc:
+                    mask |= cls._bit(e)
             except:
                 raise ValueError(f'无效的初始化值: {exc!r}')
+        return cls._of(mask)
 
-        if len(self._types) == 0:
-            self._types.add(None)
+    @staticmethod
+    def _table() -> "_ExcSetTable":
+        session = current_session()
+        table = session.exc_set_table
+        if table is None:
+            table = session.exc_set_table = _ExcSetTable()
+        return table
 
-        self._always = None not in self._types
-        self._might = len(self._types - {None}) > 0
+    @classmethod
+    def _of(cls, mask: int) -> Self:
+        if mask == 0:
+            mask = 1
+        interned = cls._table().interned
+        self = interned.get(mask)
+        if self is None:
+            self = object.__new__(cls)
+            self._mask = mask
+            interned[mask] = self
+        return self
+
+    @classmethod
+    def _bit(cls, exc: _TBaseRtExc | None) -> int:
+        table = cls._table()
+        index = table.index.get(exc)
+        if index is None:
+            if not (isinstance(exc, type) and issubclass(exc, RtBaseExc)):
+                raise TypeError(exc)
+            index = table.index[exc] = len(table.classes)
+            table.classes.append(exc)
+        return 1 << index
+
+    @classmethod
+    def _mask_of(cls, exc: _TBaseRtExc | Iterable[_TBaseRtExc]) -> int:
+        if isinstance(exc, type) or exc is None:
+            return cls._bit(exc)
+        mask = 0
+        for e in exc:
+            mask |= cls._bit(e)
+        return mask
+
+    @classmethod
+    def _subclass_mask(cls, exc: tuple[_TBaseRtExc, ...]) -> int:
+        """
+        注册表中 exc 的所有子类的掩码，注册表增长后增量更新
+        """
+        table = cls._table()
+        n, mask = table.subclass_masks.get(exc, (1, 0))
+        if n < len(table.classes):
+            for i in range(n, len(table.classes)):
+                if issubclass(table.classes[i], exc):
+                    mask |= 1 << i
+            table.subclass_masks[exc] = (len(table.classes), mask)
+        return mask
+
+    @staticmethod
+    def _as_tuple(exc: _TBaseRtExc | Iterable[_TBaseRtExc]) -> tuple[_TBaseRtExc, ...]:
+        return (exc, ) if isinstance(exc, type) else tuple(exc)
+
+    def __or__(self, other: Self) -> Self:
+        return ExcSet._of(self._mask | other._mask)
+
+    @classmethod
+    def union(cls, excs: Iterable[Self]) -> Self:
+        mask = 0
+        for e in excs:
+            mask |= e._mask
+        return cls._of(mask)
 
     def remove(self, exc: _TBaseRtExc | set[_TBaseRtExc]) -> Self:
         if isinstance(exc, type):
             exc = {exc}
         assert RtAnyNormalExc not in exc
-        return ExcSet(self._types - exc)
+        return ExcSet._of(self._mask & ~self._mask_of(exc))
 
     def remove_subclasses(self, exc: _TBaseRtExc| Iterable[_TBaseRtExc]) -> Self:
-        if isinstance(exc, type):
-            exc = (exc, )
-        else:
-            exc = tuple(exc)
-        res = ExcSet(e for e in self._types if e is None or not issubclass(e, exc))
-        has_any = RtAnyNormalExc in self._types and not issubclass(RtNormalExc, exc)  # 如果被移除的类包含 RtNormalExc 的基类，则可以移除 RtAnyNormalExc
+        exc = self._as_tuple(exc)
+        mask = self._mask & ~self._subclass_mask(exc)
+        any_bit = _ANY_BIT
+        has_any = self._mask & any_bit and not issubclass(RtNormalExc, exc)  # 如果被移除的类包含 RtNormalExc 的基类，则可以移除 RtAnyNormalExc
         if not has_any:
-            res = ExcSet(res._types - {RtAnyNormalExc})
-        return res
+            mask &= ~any_bit
+        return ExcSet._of(mask)
+
+    def has_subclasses(self, exc: _TBaseRtExc | Iterable[_TBaseRtExc]) -> bool:
+        """
+        集合中是否存在 exc 的子类
+        """
+        return bool(self._mask & self._subclass_mask(self._as_tuple(exc)))
 
     @property
     def types(self) -> set[_TBaseRtExc | None]:
-        return self._types.copy()
+        res = set()
+        classes = self._table().classes
+        mask, i = self._mask, 0
+        while mask:
+            if mask & 1:
+                res.add(classes[i])
+            mask >>= 1
+            i += 1
+        return res
     @property
     def always(self) -> bool:
-        return self._always
+        return not self._mask & 1
     @property
     def might(self) -> bool:
-        return self._might
+        return self._mask != 1
+
+    def __repr__(self):
+        return f"ExcSet({self.types!r})"
+
+
+_NONE_BIT = 1
+_ANY_BIT = 2
+
+
+class _ExcSetTable:
+    """
+    ExcSet 的异常类注册表，无异常和 RtAnyNormalExc 固定占用前两位，使 EMPTY 和 ANY 在所有构建会话中有效
+    """
+
+    __slots__ = ("classes", "index", "interned", "subclass_masks")
+
+    def __init__(self):
+        self.classes: list[_TBaseRtExc | None] = [None, RtAnyNormalExc]
+        self.index: dict[_TBaseRtExc | None, int] = {None: 0, RtAnyNormalExc: 1}
+        self.interned: dict[int, ExcSet] = {_NONE_BIT: ExcSet.EMPTY, _NONE_BIT | _ANY_BIT: ExcSet.ANY}
+        self.subclass_masks: dict[tuple[_TBaseRtExc, ...], tuple[int, int]] = {}  # 异常类 -> (计算时的注册表长度, 子类掩码)
 
 
-ExcSet.EMPTY = ExcSet(None)
-ExcSet.ANY = ExcSet({None, RtAnyNormalExc})
+ExcSet.EMPTY = object.__new__(ExcSet)
+ExcSet.EMPTY._mask = _NONE_BIT
+ExcSet.ANY = object.__new__(ExcSet)
+ExcSet.ANY._mask = _NONE_BIT | _ANY_BIT
 
 
 class RtBaseVar(ABC):
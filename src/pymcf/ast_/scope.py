@@ -1,15 +1,17 @@
+from ast import AST
+from functools import cached_property
 from typing import Any, Self
 
+from pymcf.session import current_session
+
 from .runtime import RtContinue, RtBreak
-from .syntactic import Block, stmt, ExcSet
+from .syntactic import Block, stmt, ExcSet, Call
 
 
 class Scope:
 
-    _all: list[Self] = []
-
     def __init__(self, name: str, set_throws=None):
-        Scope._all.append(self)
+        current_session().scopes.append(self)
 
         self.name = name
         self.namespace = None  # TODO
@@ -60,6 +62,31 @@ class Scope:
         assert self.finished
         return self._return_value
 
+    @cached_property
+    def callees(self) -> set[Self]:
+        """
+        直接调用的 scope，只能在 scope 完成后获取
+        """
+        assert self.finished
+        res = set()
+        stack: list[AST] = [self._root_block]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Call) and isinstance(node.func, Scope):
+                res.add(node.func)
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if isinstance(value, AST):
+                    stack.append(value)
+                elif isinstance(value, list):
+                    stack.extend(v for v in value if isinstance(v, AST))
+        return res
+
+    def reset_compile_state(self):
+        """
+        清除后端编译时记录的状态，使构建完成的 scope 可以在之后的构建中重新编译
+        """
+
     def finish(self):
         assert not self._finished
 
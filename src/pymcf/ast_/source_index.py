@@ -0,0 +1,92 @@
+"""
+模组源码索引
+
+同一模组中的函数共享一次源码读取和语法解析，按 co_firstlineno 定位函数定义。
+"""
+import linecache
+from ast import AsyncFunctionDef, FunctionDef, increment_lineno, parse, walk
+from types import FunctionType
+
+
+def parse_function(lines: list[str], start_line: int) -> FunctionDef | AsyncFunctionDef:
+    """
+    解析单个函数定义的源码，返回的节点行号与源文件一致
+    """
+    if lines[0].startswith((' ', '\t')):  # 判断函数定义是否存在整体缩进
+        """
+        不能随意删除缩进，否则可能导致多行字符串的内容发生改变。
+        此处将函数定义包裹在 if 内部使语法解析正确进行。
+        """
+        node = parse("if True:\n" + "".join(lines), mode='exec').body[0].body[0]
+        return increment_lineno(node, start_line - 2)
+    else:
+        node = parse("".join(lines), mode='exec').body[0]
+        return increment_lineno(node, start_line - 1)
+
+
+class FunctionSource:
+    """
+    模组中的一个函数定义，start_line 为第一个装饰器所在行（与 co_firstlineno 一致）
+    """
+
+    __slots__ = ("module", "name", "start_line", "end_line", "_node")
+
+    def __init__(self, module: "ModuleSource", node: FunctionDef | AsyncFunctionDef):
+        self.module = module
+        self.name = node.name
+        self.start_line = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+        self.end_line = node.end_lineno
+        self._node = node
+
+    @property
+    def lines(self) -> list[str]:
+        return self.module.lines[self.start_line - 1:self.end_line]
+
+    def take_node(self) -> FunctionDef | AsyncFunctionDef:
+        """
+        获取可以自由修改的函数定义节点
+
+        第一次调用直接交出模组解析得到的节点，之后重新解析该函数的源码（比深拷贝更快）。
+        """
+        node, self._node = self._node, None
+        if node is None:
+            node = parse_function(self.lines, self.start_line)
+        return node
+
+
+class ModuleSource:
+
+    def __init__(self, filename: str, lines: list[str]):
+        self.filename = filename
+        self.lines = lines
+        self.functions: dict[int, list[FunctionSource]] = {}
+        try:
+            tree = parse("".join(lines), filename)
+        except (SyntaxError, ValueError):
+            return
+        for node in walk(tree):
+            if isinstance(node, FunctionDef | AsyncFunctionDef):
+                func = FunctionSource(self, node)
+                self.functions.setdefault(func.start_line, []).append(func)
+
+
+_modules: dict[str, ModuleSource] = {}
+
+
+def find_function(func: FunctionType) -> FunctionSource | None:
+    """
+    在函数所在模组的索引中查找函数定义，无法通过索引定位时返回 None（如 lambda 或源码不可用）
+    """
+    code = func.__code__
+    filename = code.co_filename
+    linecache.checkcache(filename)
+    lines = linecache.getlines(filename, func.__globals__)
+    if not lines:
+        return None
+    module = _modules.get(filename)
+    if module is None or module.lines is not lines:
+        module = _modules[filename] = ModuleSource(filename, lines)
+    for f in module.functions.get(code.co_firstlineno, ()):
+        if f.name == code.co_name:
+            return f
+    return None
@@ -0,0 +1,164 @@
+"""
+批量构建
+
+在常驻的工作进程中依次构建多个数据包。每个构建任务在独立的构建会话中执行入口脚本，工作进程中已导入的 pymcf 和库模组、
+源码索引和 ast 改写结果在任务之间复用，省去每次构建的解释器启动和导入开销。
+
+    from pymcf.batch import BuildJob, build_all
+
+    results = build_all([
+        BuildJob("packs/main.py", {"prj_pack_format": 71, "prj_install_dir": Path("out/71")}),
+        BuildJob("packs/main.py", {"prj_pack_format": 81, "prj_install_dir": Path("out/81")}),
+    ], workers=4)
+"""
+import importlib
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+from pymcf.project import Project
+from pymcf.session import BuildSession
+
+
+class BuildJob:
+    """
+    构建任务
+
+    entry: 入口脚本路径或模组名，脚本中应创建 Project，脚本没有调用 build 时在执行后自动构建
+    config: 覆盖 Project 的配置项
+    """
+
+    def __init__(self, entry: str | Path, config: dict[str, Any] | None = None, name: str | None = None):
+        self.entry = entry
+        self.config = config or {}
+        self.name = name if name is not None else str(entry)
+
+    def __repr__(self):
+        return f"BuildJob({self.name!r})"
+
+
+class BuildResult:
+    """
+    构建任务的结果，error 为构建失败时的异常信息
+    """
+
+    def __init__(self, name: str, time: float, error: str | None = None,
+                 changes: dict | None = None, overflowed: dict[str, int] | None = None,
+                 incremental: dict[str, int] | None = None):
+        self.name = name
+        self.time = time
+        self.error = error
+        self.changes = changes  # 输出差异，同 changes.json
+        self.overflowed = overflowed or {}
+        self.incremental = incremental  # 增量构建时复用和重新编译的函数数量，同 Project.cache_stats
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "success": self.success,
+            "time": self.time,
+            "error": self.error,
+            "changes": self.changes,
+            "overflowed": self.overflowed,
+            "incremental": self.incremental,
+        }
+
+    def notes(self) -> list[str]:
+        return build_notes(self.incremental, self.overflowed)
+
+
+def build_notes(incremental: dict[str, int] | None, overflowed: dict[str, int]) -> list[str]:
+    """
+    构建完成后需要提示的信息，由命令行和监视模式在主进程中输出
+    """
+    notes = []
+    if incremental is not None:
+        notes.append(f"增量构建：复用 {incremental['reused']} 个函数，重新编译 {incremental['compiled']} 个函数")
+    if overflowed:
+        notes.append("以下函数的函数体数量超过上限，部分调用的编译期整数参数已提升为运行期参数：")
+        notes += [f"  {name}: {count} 次调用" for name, count in overflowed.items()]
+    return notes
+
+
+def is_script(entry: str | Path) -> bool:
+    """
+    入口是脚本路径（而不是模组名）
+    """
+    return isinstance(entry, Path) or entry.endswith(".py") or os.path.sep in entry or os.path.isfile(entry)
+
+
+def run_entry(entry: str | Path) -> Project:
+    """
+    在当前构建会话中执行入口脚本或模组，入口没有调用 build 时进行构建
+    :return: 入口中创建的 Project
+    """
+    if is_script(entry):
+        path = Path(entry).resolve()
+        if str(path.parent) not in sys.path:
+            sys.path.insert(0, str(path.parent))  # 与直接运行脚本相同，可以导入脚本旁的模组
+        runpy.run_path(str(path), run_name="__main__")
+    else:
+        runpy.run_module(str(entry), run_name="__main__", alter_sys=True)
+    project = Project.instance()
+    if project is None:
+        raise ValueError(f"{entry} 中没有创建 Project")
+    if not project.built:
+        project.build()
+    return project
+
+
+def run_job(job: BuildJob) -> BuildResult:
+    """
+    在当前进程中执行构建任务
+    """
+    start = time.perf_counter()
+    try:
+        with BuildSession(job.config):
+            project = run_entry(job.entry)
+            diff = project.diff
+            return BuildResult(
+                job.name, time.perf_counter() - start,
+                changes=diff.to_json() if diff is not None else None,
+                overflowed=dict(project.overflowed),
+                incremental=project.cache_stats,
+            )
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except BaseException:
+        return BuildResult(job.name, time.perf_counter() - start, error=traceback.format_exc())
+
+
+def _preload(modules: Iterable[str]):
+    for module in modules:
+        importlib.import_module(module)
+
+
+def build_all(jobs: Iterable[BuildJob], workers: int = 0, preload: Iterable[str] = ()) -> list[BuildResult]:
+    """
+    构建所有任务，结果顺序与 jobs 一致
+
+    :param workers: 工作进程数，为 0 时使用全部 CPU 核心，为 1 时在当前进程中依次构建
+    :param preload: 工作进程启动时预先导入的模组
+    """
+    jobs = list(jobs)
+    preload = tuple(preload)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        _preload(preload)
+        return [run_job(job) for job in jobs]
+
+    # fork 时工作进程直接继承当前进程已导入的模组
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                             initializer=_preload, initargs=(preload, )) as pool:
+        return list(pool.map(run_job, jobs))
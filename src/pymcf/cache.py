@@ -0,0 +1,182 @@
+import json
+from ast import AST
+from hashlib import blake2b
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+from pymcf.ast_ import Resolvable, RtBaseExc, Scope
+from pymcf.ast_.runtime import ExcSet
+from pymcf.config import Config, config_items
+
+_CACHE_FORMAT = 1
+
+
+def _compiler_digest() -> str:
+    """
+    pymcf 自身的版本标识，包含安装版本与源码文件状态，源码修改后缓存自动失效
+    """
+    h = blake2b(digest_size=16)
+    try:
+        h.update(metadata.version("pymcf").encode())
+    except metadata.PackageNotFoundError:
+        pass
+    pkg_dir = Path(__file__).parent
+    for file in sorted(pkg_dir.rglob("*.py")):
+        stat = file.stat()
+        h.update(f"{file.relative_to(pkg_dir).as_posix()}:{stat.st_mtime_ns}:{stat.st_size}\0".encode())
+    return h.hexdigest()
+
+
+class Unfingerprintable(Exception):
+    """
+    scope 中存在无法稳定表示的值，此 scope 不参与缓存
+    """
+
+
+class ScopeFingerprint:
+    """
+    计算构建完成的 scope 的结构指纹
+
+    仅凭函数源码和参数不足以确定生成结果：全局变量、内联函数、被调函数的异常集和 errno 分配都会影响输出，
+    因此直接对构建结果（语句树及其引用的运行期量）取指纹。
+    """
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self._hash = blake2b(digest_size=20)
+
+    def _feed(self, token: str):
+        self._hash.update(token.encode())
+        self._hash.update(b"\0")
+
+    def _exc_type(self, exc: type[RtBaseExc] | None) -> str:
+        if exc is None:
+            return "None"
+        return f"{exc.__module__}.{exc.__qualname__}{exc._errno_range}"
+
+    def _scope(self, callee) -> str:
+        executor = callee.executor
+        if executor is None:
+            executor = "None"
+        elif executor == self.scope.executor:
+            executor = "self"
+        else:
+            executor = executor.__metadata__.resolve(self.scope)
+        excs = ",".join(sorted(self._exc_type(e) for e in callee.excs.types)) if callee.excs_or_none is not None else "?"
+        return f"{callee.nsname}|{callee.macro}|{executor}|{excs}"
+
+    def update(self, *values: Any) -> "ScopeFingerprint":
+        stack = list(reversed(values))
+        while stack:
+            value = stack.pop()
+            if value is None or isinstance(value, bool | int | float | complex | str):
+                self._feed(f"{type(value).__name__}:{value!r}")
+            elif isinstance(value, AST):
+                fields = value._fields + value._attributes
+                self._feed(f"<{type(value).__module__}.{type(value).__qualname__}:{len(fields)}")
+                stack.extend(getattr(value, f, None) for f in reversed(fields))
+            elif isinstance(value, list | tuple):
+                self._feed(f"[{len(value)}")
+                stack.extend(reversed(value))
+            elif isinstance(value, dict):
+                self._feed(f"{{{len(value)}")
+                for k, v in reversed(value.items()):
+                    stack.append(v)
+                    stack.append(k)
+            elif isinstance(value, Scope):
+                self._feed(f"scope:{self._scope(value)}")
+            elif isinstance(value, ExcSet):
+                self._feed(f"excs:{','.join(sorted(self._exc_type(e) for e in value.types))}")
+            elif isinstance(value, type) and issubclass(value, RtBaseExc):
+                self._feed(f"exc_type:{self._exc_type(value)}")
+            elif isinstance(value, RtBaseExc):
+                self._feed(f"exc:{self._exc_type(type(value))}:{value._errno}")
+            elif isinstance(value, Resolvable):
+                shema = getattr(value, "shema", None)
+                self._feed(f"{type(value).__qualname__}:{value.resolve(self.scope)}:{getattr(shema, '__qualname__', shema)}")
+            elif type(value).__repr__ is not object.__repr__:
+                self._feed(f"{type(value).__qualname__}:{value!r}")
+            else:
+                raise Unfingerprintable(value)
+        return self
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class BuildCache:
+    """
+    增量构建缓存
+
+    以 scope 名称为索引记录上一次构建的 mcfunction 文本，构建指纹未变化时直接复用
+    """
+
+    def __init__(self, path: Path, config: Config):
+        self.path = path
+        self._salt = json.dumps([
+            _CACHE_FORMAT,
+            _compiler_digest(),
+            {k: repr(v) for k, v in config_items(config, ("ir_", "mc_")).items() if k != "ir_bf"},
+        ])
+        self._config = config
+        self._entries: dict[str, dict] = {}
+        self._used: dict[str, dict] = {}
+        self.hits = 0  # 本次构建中复用缓存的 scope 数量
+        self.misses = 0  # 本次构建中重新编译的 scope 数量，包括无法缓存的 scope
+        try:
+            with self.path.open("rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("salt") == self._salt:
+                self._entries = data["scopes"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def key(self, scope) -> str | None:
+        """
+        计算 scope 的缓存键，scope 无法被稳定表示时返回 None
+        """
+        try:
+            fp = ScopeFingerprint(scope).update(
+                scope.name,
+                scope.namespace,
+                scope.macro,
+                getattr(scope, "private_locals", None),
+                self._config.ir_bf,
+                scope._root_block,
+            )
+        except Unfingerprintable:
+            return None
+        return fp.hexdigest()
+
+    def get(self, name: str, key: str | None) -> dict | None:
+        """
+        查询缓存，不修改缓存状态，可以在构建子进程中调用
+        :return: 命中时返回 {"files": [[name, code], ...], "consts": [...]}
+        """
+        if key is None:
+            return None
+        entry = self._entries.get(name)
+        if entry is None or entry["key"] != key:
+            return None
+        return entry
+
+    def put(self, name: str, key: str | None, files: list[tuple[str, str]], consts: list[int], hit: bool = False):
+        """
+        记录本次构建中 scope 的结果
+        """
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if key is None:
+            return
+        self._used[name] = {"key": key, "files": files, "consts": consts}
+
+    def save(self):
+        """
+        仅保留本次构建用到的条目
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("wt", encoding="utf-8") as f:
+            json.dump({"salt": self._salt, "scopes": self._used}, f)
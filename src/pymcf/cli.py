@@ -0,0 +1,117 @@
+"""
+命令行入口
+
+    pymcf build pack.py --jobs 4 --incremental --out dir -O1
+    pymcf build packs/a.py packs/b.py --workers 2 -c prj_pack_format=71
+    pymcf watch pack.py --out dir
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from pymcf.batch import BuildJob, build_all
+from pymcf.config import parse_item
+from pymcf.ir import OPT_LEVELS
+from pymcf.watch import Watcher
+
+
+def _config_item(text: str) -> tuple[str, str]:
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"配置项应为 KEY=VALUE 形式：{text!r}")
+    return key.strip(), value
+
+
+def build_config(args: argparse.Namespace) -> dict[str, Any]:
+    """
+    由命令行参数生成覆盖配置，未指定的选项不覆盖脚本中的配置
+    """
+    config = {}
+    if args.opt_level is not None:
+        config.update(OPT_LEVELS[args.opt_level])
+    if args.jobs is not None:
+        config["prj_jobs"] = args.jobs
+    if args.incremental is not None:
+        config["prj_incremental"] = args.incremental
+    if args.profile:
+        config["prj_profile"] = True
+    if args.out is not None:
+        config["prj_output"] = args.out
+    if args.install_dir is not None:
+        config["prj_install_dir"] = args.install_dir
+    for key, value in args.config:
+        config[key] = parse_item(key, value)
+    return config
+
+
+def _add_build_options(parser: argparse.ArgumentParser):
+    parser.add_argument("-j", "--jobs", type=int, help="后端编译使用的进程数（prj_jobs），为 0 时使用全部 CPU 核心")
+    parser.add_argument("--incremental", action=argparse.BooleanOptionalAction, help="是否启用增量构建（prj_incremental）")
+    parser.add_argument("--profile", action="store_true", help="记录并打印各构建阶段的性能数据（prj_profile）")
+    parser.add_argument("--out", choices=("zip", "dir"), help="输出方式（prj_output）")
+    parser.add_argument("-o", "--install-dir", type=Path, help="数据包导出目录（prj_install_dir）")
+    parser.add_argument("-O", "--opt-level", type=int, choices=sorted(OPT_LEVELS), help="优化等级，默认使用最高等级")
+    parser.add_argument("-c", "--config", type=_config_item, action="append", default=[], metavar="KEY=VALUE",
+                        help="覆盖任意配置项，可以重复使用")
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pymcf")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="构建数据包")
+    build.add_argument("entries", nargs="+", metavar="ENTRY", help="入口脚本路径或模组名")
+    _add_build_options(build)
+    build.add_argument("-w", "--workers", type=int, default=0,
+                       help="同时构建多个入口时的工作进程数，为 0 时使用全部 CPU 核心")
+    build.add_argument("--report", type=Path, help="将构建结果写入 JSON 文件")
+
+    watch = commands.add_parser("watch", help="监视源文件并在修改后重新构建")
+    watch.add_argument("entry", metavar="ENTRY", help="入口脚本路径或模组名")
+    _add_build_options(watch)
+    watch.add_argument("--interval", type=float, default=0.3, help="检查源文件修改的间隔秒数")
+    return parser
+
+
+def cmd_build(args: argparse.Namespace) -> int:
+    config = build_config(args)
+    jobs = [BuildJob(entry, config) for entry in args.entries]
+    results = build_all(jobs, workers=args.workers)
+    for result in results:
+        if result.success:
+            print(f"{result.name}: 构建完成 ({result.time:.2f}s)")
+            for note in result.notes():
+                print(f"  {note}")
+        else:
+            print(f"{result.name}: 构建失败 ({result.time:.2f}s)\n{result.error}", file=sys.stderr)
+    if args.report is not None:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        with args.report.open("wt", encoding="utf-8") as f:
+            json.dump([result.to_json() for result in results], f, indent=4)
+    return 0 if all(result.success for result in results) else 1
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    config = build_config(args)
+    config.setdefault("prj_incremental", True)  # 未修改的函数直接复用上次生成的 mcfunction
+    try:
+        Watcher(args.entry, config, interval=args.interval).run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    try:
+        match args.command:
+            case "build":
+                return cmd_build(args)
+            case "watch":
+                return cmd_watch(args)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e.args[0]) if e.args else str(e))
+    return 2
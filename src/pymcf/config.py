@@ -1,6 +1,8 @@
 import abc
+import ast
 from collections import defaultdict
-from typing import Self
+from pathlib import Path
+from typing import Self, Any
 
 
 class _TypeRec:
@@ -69,4 +71,33 @@ def dump_config(config: Config = None) -> str:
     res = ""
     for key in _items:
         res += f"{'+' if key in _queried_keys else ' '} {key}: {_items[key].typ} = {getattr(config, key)}\n"
-    return res
\ No newline at end of file
+    return res
+
+def config_items(config: Config, prefix: str | tuple[str, ...]) -> dict[str, Any]:
+    """
+    获取以 prefix 开头的所有配置项的值
+    """
+    return {key: getattr(config, key) for key in _items if key.startswith(prefix)}
+
+def parse_item(key: str, text: str) -> Any:
+    """
+    将文本解析为配置项的值（用于命令行等文本来源），按配置项定义的类型转换
+    """
+    if key not in _items or not _items[key].def_cls:
+        raise KeyError(f"未知的配置项：{key}")
+    typ = _items[key].typ
+    if typ is bool:
+        match text.lower():
+            case "1" | "true" | "yes" | "on":
+                return True
+            case "0" | "false" | "no" | "off":
+                return False
+        raise ValueError(f"配置项 {key} 需要布尔值：{text!r}")
+    if typ is str:
+        return text
+    if typ is int or typ is Path:
+        return typ(text)
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
@@ -9,6 +9,7 @@ from pymcf.mc.commands import ScoreRef, EntityRef, ObjectiveRef, NameRef, NbtPat
     RefWrapper, TextScoreComponent, TextComponent, ScoreboardAdd, AtE, AtS, EntityReference, \
     Selector, Storage, TextNBTComponent, MacroRef
 from pymcf.mcfunction import mcfunction
+from pymcf.session import record_module_scoreboard
 from .nbtlib import *
 
 
@@ -268,6 +269,7 @@ class ScoreBoard(RefWrapper[ObjectiveRef]):
     def try_add_new_scb(name, criteria, display_name):
         from pymcf.project import Project
         prj = Project.instance()
+        record_module_scoreboard(name, criteria, display_name)
         if name in prj.scb_rec:
             assert criteria == prj.scb_rec[name][0]
         else:
@@ -8,6 +8,7 @@ class DebugStub(compiler_hint):
     """
     用于在可视化视图中定位 debug 语句
     """
+    __slots__ = ()
 
     @mcfunction.inline
     def __init__(self, **__):
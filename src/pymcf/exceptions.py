@@ -1,70 +1,105 @@
 from collections import defaultdict
+from itertools import count
+from weakref import WeakValueDictionary
 
 from .ast_ import RtBaseExc
 from .ast_.runtime import RtNormalExc, _RtNormalExcMeta
+from .session import current_session
 
-_all_cls: list[type["RtExc"]] = []
-_all_instance = defaultdict(list)
+# 按创建顺序记录存活的异常类和异常实例，异常编号由每个构建会话在 confirm 时分配
+_all_cls: WeakValueDictionary[int, type["RtExc"]] = WeakValueDictionary()
+_all_instance: WeakValueDictionary[int, "RtExc"] = WeakValueDictionary()
+_order = count()
+_cls_order: dict[tuple[str, str], int] = {}  # (模组, 限定名) -> 异常类的创建顺序
 
-_confirmed = False
+
+def _define_order(cls) -> int:
+    """
+    重新定义的异常类（监视模式下重新导入模组）沿用之前的创建顺序，使异常编号与在新的进程中构建相同
+    """
+    key = cls.__module__, cls.__qualname__
+    order = _cls_order.get(key)
+    if order is None or order in _all_cls:
+        order = _cls_order[key] = next(_order)
+    return order
 
 
 class _RtExcMeta(_RtNormalExcMeta):
 
     def __new__(mcls, name, bases, namespace, **kwargs):
-        assert not _confirmed
+        assert not current_session().exc_confirmed
         cls = super().__new__(mcls, name, bases, namespace, **kwargs)
-        cls._errno_range = NotImplemented
-        _all_cls.append(cls)
+        _all_cls[_define_order(cls)] = cls
         return cls
 
+    @property
+    def _errno_range(cls):
+        return current_session().exc_ranges.get(cls, NotImplemented)
+
     @property
     def errno_range(cls):
-        assert _confirmed
+        assert current_session().exc_confirmed
         return cls._errno_range
 
 class RtExc(RtNormalExc, metaclass=_RtExcMeta):
     def __new__(cls, *args, **kwargs):
-        assert not _confirmed
+        assert not current_session().exc_confirmed
         self = super().__new__(cls)
-        _all_instance[type(self)].append(self)
-        self._errno = NotImplemented
+        _all_instance[next(_order)] = self
         return self
 
     def __init__(self, *args, **kwargs):
         super(RtBaseExc, self).__init__(*args, **kwargs)
 
+    @property
+    def _errno(self):
+        return current_session().exc_errno.get(self, NotImplemented)
+
     @property
     def errno(self):
-        assert _confirmed
+        assert current_session().exc_confirmed
         return self._errno
 
 
-def confirm():
-    global _confirmed
-    assert not _confirmed
-    _confirmed = True
+def forget(modules: set[str]):
+    """
+    丢弃 modules 中定义的异常类及这些类的实例，在重新导入模组前调用。旧的异常类在重新导入前仍被模组引用，
+    不会被回收，不丢弃时会继续参与异常编号
+    """
+    for registry in (_all_cls, _all_instance):
+        for key, value in list(registry.items()):
+            if value.__module__ in modules:
+                del registry[key]
 
-    if len(_all_instance) == 0:
+
+def confirm():
+    session = current_session()
+    assert not session.exc_confirmed
+    session.exc_confirmed = True
+
+    all_instance = defaultdict(list)
+    for exc in list(_all_instance.values()):
+        all_instance[type(exc)].append(exc)
+    if len(all_instance) == 0:
         return
 
-    max_instance = max(len(v) for v in _all_instance.values())
+    max_instance = max(len(v) for v in all_instance.values())
     cls_shift = 10 ** len(str(max_instance))
 
-    RtExc._errno_range = [1, 1]
-    for cls in _all_cls:
+    errno_range = {RtExc: [1, 1]}
+    for _, cls in sorted(_all_cls.items(), key=lambda item: item[0]):
         flag = False
         for base in cls.mro()[1:]:
             if issubclass(base, RtExc):
-                base._errno_range[1] += 1
+                errno_range[base][1] += 1
                 if not flag:
-                    cls._errno_range = [base._errno_range[1], base._errno_range[1]]
+                    errno_range[cls] = [errno_range[base][1], errno_range[base][1]]
                     flag = True
 
-    for cls, excs in _all_instance.items():
-        cls_base = cls.errno_range[0] * cls_shift
+    for cls, excs in all_instance.items():
+        cls_base = errno_range[cls][0] * cls_shift
         for i, exc in enumerate(excs):
-            exc._errno = cls_base + i
+            session.exc_errno[exc] = cls_base + i
 
-    for cls in _all_cls:
-        cls._errno_range = (cls._errno_range[0] * cls_shift, (cls._errno_range[1] + 1) * cls_shift - 1)
\ No newline at end of file
+    for cls, (lo, hi) in errno_range.items():
+        session.exc_ranges[cls] = (lo * cls_shift, (hi + 1) * cls_shift - 1)
@@ -1,2 +1,7 @@
-from .ir_gen import Compiler
-from .codeblock import code_block, BasicBlock, MatchJump
\ No newline at end of file
+from .ir_gen import Compiler, OPT_LEVELS
+from .codeblock import code_block, BasicBlock, MatchJump
+from .liveness import Liveness, private_locals
+from .slots import SlotAllocator
+from .constants import ConstantFolder
+from .copies import CopyCoalescer
+from .dead_store import DeadStoreEliminator
\ No newline at end of file
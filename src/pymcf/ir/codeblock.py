@@ -6,6 +6,8 @@ from pymcf.ast_ import operation, compiler_hint
 
 
 class code_block(ast.AST):
+    __slots__ = ("name", "attributes")
+
     def __init__(self, name: str):
         self.name = name
         self.attributes = {}
@@ -18,6 +20,7 @@ class BasicBlock(code_block):
     2. 直接跳转到 self.direct
     3. 判断 self.cond，选择下一个跳转的块为 self.true 或 self.false
     """
+    __slots__ = ("ops", "direct", "cond", "false", "true")
     _fields = ("ops", "direct", "cond", "false", "true")
     _attributes = ("name", "attributes", )
     def __init__(self, name: str):
@@ -34,6 +37,7 @@ class BasicBlock(code_block):
 
 
 class jmpop(ast.AST):
+    __slots__ = ("target", )
     _fields = ("target", )
     # 均要具有 target 字段指向跳转的 block，target 为 None 表示匹配成功时仅中断匹配流程而没有进一步动作
     def __init__(self, target: code_block | None):
@@ -41,6 +45,7 @@ class jmpop(ast.AST):
 
 
 class JmpEq(jmpop):
+    __slots__ = ("value", )
     _fields = ("value", "target")
     def __init__(self, value: Any, target: code_block):
         super().__init__(target)
@@ -48,6 +53,7 @@ class JmpEq(jmpop):
 
 
 class JmpNotEq(jmpop):
+    __slots__ = ("value", )
     _fields = ("value", "target")
     def __init__(self, value: Any, target: code_block):
         super().__init__(target)
@@ -62,6 +68,7 @@ class MatchJump(code_block):
 
     inactivate 表示跳转后应当为 flag（副本）设置值，避免其余分支响应
     """
+    __slots__ = ("flag", "cases", "inactive")
     _fields = ("flag", "cases", "inactive")
     _attributes = ("name", "attributes")
     def __init__(self, flag: Any, cases: list[jmpop], inactive: Any = 0, name: str = None):
@@ -72,6 +79,7 @@ class MatchJump(code_block):
 
 
 class IrBlockAttr(compiler_hint):
+    __slots__ = ("attr", )
     _attributes = ("attr", )
     def __init__(self, attr: dict, **kwargs):
         self.attr = attr
@@ -0,0 +1,289 @@
+"""
+条件常量传播
+
+对候选变量（只在当前函数内部使用的局部变量）进行稀疏条件常量传播：从函数入口出发，只沿可能执行的边传播变量的常量值，
+条件已知的分支只有一侧可能执行。分析完成后：
+
+- 结果已知的赋值、运算和比较替换为设置常量，读取常量变量的加减和比较改为使用常量
+- 条件已知的块只保留会执行的分支，不再可达的块随之被删除
+
+运算结果按计分板的 32 位整数和向下取整的除法、取模计算，除数为 0 时不折叠。函数入口处所有变量的值视为未知。
+"""
+from ast import Add, Sub, Mult, Div, FloorDiv, Mod, And, Or, UAdd, USub, Not
+from typing import Callable
+
+from pymcf.ast_ import Assign, UnaryOp, Inplace, Compare, Eq, NotEq, Lt, LtE, Gt, GtE, RtBaseVar, operation
+from .codeblock import code_block, BasicBlock, MatchJump
+from .liveness import Liveness, op_fields, replace_fields
+
+
+def _i32(value: int) -> int:
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value >= 1 << 31 else value
+
+
+def _div(a: int, b: int) -> int | None:
+    return a // b if b != 0 else None
+
+
+def _mod(a: int, b: int) -> int | None:
+    return a % b if b != 0 else None
+
+
+# 与 Translator 生成的命令一致，读取运行期量和常量时生成的命令不同的运算分别列出
+_INPLACE: dict[type, Callable[[int, int], int | None]] = {
+    Add: lambda a, b: a + b,
+    Sub: lambda a, b: a - b,
+    Mult: lambda a, b: a * b,
+    Div: _div,
+    FloorDiv: _div,
+    Mod: _mod,
+}
+_INPLACE_VAR = {**_INPLACE, And: lambda a, b: a * b, Or: lambda a, b: b if a == 0 else a}
+_INPLACE_CONST = {**_INPLACE, And: lambda a, b: a if b else 0, Or: lambda a, b: 1 if b else a}
+
+_UNARY: dict[type, Callable[[int], int]] = {
+    UAdd: lambda a: a,
+    USub: lambda a: -a,
+    Not: lambda a: int(a == 0),
+}
+
+_COMPARE: dict[type, Callable[[int, int], bool]] = {
+    Eq: lambda a, b: a == b,
+    NotEq: lambda a, b: a != b,
+    Lt: lambda a, b: a < b,
+    LtE: lambda a, b: a <= b,
+    Gt: lambda a, b: a > b,
+    GtE: lambda a, b: a >= b,
+}
+
+
+class _Edge:
+    __slots__ = ("dst", "feasible", "enabled", "dependents")
+
+    def __init__(self, dst: tuple, feasible: Callable[[dict], bool] | None = None):
+        self.dst = dst
+        self.feasible = feasible  # 根据起点之后的状态判断边是否可能执行，None 表示总是可能执行
+        self.enabled = False
+        self.dependents: list[tuple[tuple, _Edge]] = []  # 调用边可能执行时随之可能执行的返回边（及其起点）
+
+
+class ConstantFolder(Liveness):
+    """
+    候选变量的条件常量传播，只替换块的操作列表和分支，不修改操作对象
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 节点 -> 节点之前 / 之后已知的常量值（变量的位 -> 值），不可能执行的节点不在其中
+        self._in: dict[tuple, dict[int, int]] = {}
+        self._out: dict[tuple, dict[int, int]] = {}
+
+    def _value(self, value, state: dict[int, int]) -> int | None:
+        if isinstance(value, int):
+            return int(value)
+        bit = self._bit(value)
+        return state.get(bit) if bit else None
+
+    def _cond(self, cond, state: dict[int, int]) -> int | None:
+        return None if cond is None else self._value(cond, state)
+
+    def _step(self, op, state: dict[int, int], rewrite: bool = False) -> operation | None:
+        """
+        执行一个操作，更新 state
+
+        :return: rewrite 为真时返回替代的操作，不替换时返回 None
+        """
+        fields = op_fields(type(op))
+        if fields is None or not fields[1]:
+            return None
+        target = op.target
+        res = None
+        replace = None
+        if isinstance(op, Assign):
+            if op.value is not None:
+                res = self._value(op.value, state)
+        elif isinstance(op, UnaryOp):
+            func = _UNARY.get(type(op.op))
+            if func is not None and isinstance(op.value, RtBaseVar) and (v := self._value(op.value, state)) is not None:
+                res = func(v)
+        elif isinstance(op, Inplace):
+            value = op.value
+            func = (_INPLACE_VAR if isinstance(value, RtBaseVar) else _INPLACE_CONST).get(type(op.op))
+            t = self._value(target, state)
+            v = self._value(value, state)
+            if func is not None and t is not None and v is not None:
+                res = func(t, v)
+            elif rewrite and v is not None and isinstance(value, RtBaseVar):
+                replace = self._const_operand(op, v)
+        elif isinstance(op, Compare):
+            func = _COMPARE.get(type(op.op))
+            left = self._value(op.left, state) if op.left is not None else None
+            right = self._value(op.right, state) if op.right is not None else None
+            if func is not None and left is not None and right is not None:
+                res = int(func(left, right))
+            elif not rewrite:
+                pass
+            elif isinstance(op.left, RtBaseVar) and left is not None and isinstance(op.right, RtBaseVar):
+                replace = replace_fields(op, {"left": left})
+            elif isinstance(op.right, RtBaseVar) and right is not None and isinstance(op.left, RtBaseVar):
+                replace = replace_fields(op, {"right": right})
+
+        if res is not None:
+            res = _i32(res)
+            if rewrite and self.key(target) is not None and not (isinstance(op, Assign) and type(op.value) is int and op.value == res):
+                replace = Assign(target, res, _offline=True)
+        if bit := self._bit(target):
+            if res is None:
+                state.pop(bit, None)
+            else:
+                state[bit] = res
+        return replace
+
+    @staticmethod
+    def _const_operand(op: Inplace, value: int) -> operation | None:
+        """
+        原地运算读取的变量值已知时，改为读取常量。乘除和取模读取常量时需要额外的常量计分板项，保持读取变量
+        """
+        typ = type(op.op)
+        if typ is And:
+            return replace_fields(op, {"value": value}) if value in (0, 1) else None
+        if typ in (Add, Sub):
+            if value < 0:
+                if value == -1 << 31:
+                    return None
+                return Inplace(Sub() if typ is Add else Add(), op.target, -value, _offline=True)
+            return replace_fields(op, {"value": value})
+        return None
+
+    def _build_edges(self) -> dict[tuple, list[_Edge]]:
+        edges: dict[tuple, list[_Edge]] = {}
+
+        def edge(a, b, feasible=None) -> _Edge:
+            e = _Edge(b, feasible)
+            edges.setdefault(a, []).append(e)
+            return e
+
+        def call(site, target: code_block, ret, feasible=None):
+            e = edge(site, (target, 0), feasible)
+            e.dependents.append(((target, 2), edge((target, 2), ret, lambda _: False)))
+            if target.attributes.get("execute") is not None:
+                e.dependents.append((site, edge(site, ret, lambda _: False)))
+                edge((target, 2), (target, 0))
+
+        def cond_is(cb, nonzero: bool):
+            def feasible(state):
+                v = self._cond(cb.cond, state)
+                return v is None or bool(v) == nonzero
+            return feasible
+
+        for cb in self.blocks:
+            if isinstance(cb, BasicBlock):
+                if cb.direct is not None:
+                    call((cb, 0), cb.direct, (cb, 1))
+                else:
+                    edge((cb, 0), (cb, 1))
+                if cb.cond is not None and (cb.true is not None or cb.false is not None):
+                    if cb.true is not None:
+                        call((cb, 1), cb.true, (cb, 2), cond_is(cb, True))
+                    if cb.false is not None:
+                        call((cb, 1), cb.false, (cb, 2), cond_is(cb, False))
+                    if cb.true is None or cb.false is None:
+                        edge((cb, 1), (cb, 2), cond_is(cb, cb.true is None))
+                else:
+                    edge((cb, 1), (cb, 2))
+            elif isinstance(cb, MatchJump):
+                edge((cb, 0), (cb, 1))
+                for case in cb.cases:
+                    if case.target is not None:
+                        call((cb, 1), case.target, (cb, 2))
+                edge((cb, 1), (cb, 2))
+            else:
+                edge((cb, 0), (cb, 1))
+                edge((cb, 1), (cb, 2))
+        return edges
+
+    def analyze(self):
+        edges = self._build_edges()
+        ins = self._in
+        ins[(self.blocks[0], 0)] = {}
+        out = self._out
+        work = [(self.blocks[0], 0)]
+        queued = set(work)
+
+        def propagate(dst, state):
+            old = ins.get(dst)
+            if old is None:
+                new = dict(state)
+            else:
+                new = {k: v for k, v in old.items() if k in state and state[k] == v}
+                if len(new) == len(old):
+                    return
+            ins[dst] = new
+            if dst not in queued:
+                queued.add(dst)
+                work.append(dst)
+
+        while work:
+            node = work.pop()
+            queued.discard(node)
+            state = dict(ins[node])
+            if node[1] == 0 and isinstance(node[0], BasicBlock):
+                for op in node[0].ops:
+                    self._step(op, state)
+            out[node] = state
+            for e in edges.get(node, ()):
+                if not e.enabled:
+                    if e.feasible is not None and not e.feasible(state):
+                        continue
+                    e.enabled = True
+                    for src, dep in e.dependents:
+                        dep.enabled = True
+                        if src in out:
+                            propagate(dep.dst, out[src])
+                propagate(e.dst, state)
+
+    def apply(self) -> bool:
+        """
+        :return: 是否删除了分支
+        """
+        if not self.candidates or not self.blocks:
+            return False
+        self.analyze()
+        pruned = False
+        for cb in self.blocks:
+            if not isinstance(cb, BasicBlock) or (cb, 0) not in self._out:
+                continue
+            replaced = False
+            ops = []
+            state = dict(self._in[(cb, 0)])
+            for op in cb.ops:
+                new = self._step(op, state, True)
+                if new is not None:
+                    replaced = True
+                    op = new
+                ops.append(op)
+            if replaced:
+                cb.ops = ops
+
+            if cb.cond is None or (cb.true is None and cb.false is None) or (cb, 1) not in self._out:
+                continue
+            v = self._cond(cb.cond, self._out[(cb, 1)])
+            if v is None:
+                continue
+            chosen = cb.true if v else cb.false
+            if chosen is None:
+                cb.cond = None
+                cb.true = cb.false = None
+            elif cb.direct is None:
+                cb.direct = chosen
+                cb.cond = None
+                cb.true = cb.false = None
+            elif isinstance(cb.cond, bool) and (cb.true is None or cb.false is None):
+                continue
+            else:
+                # direct 之后只能以条件调用其他块，使用常量条件，Translator 直接调用选择的分支
+                cb.cond = bool(v)
+                cb.true, cb.false = (chosen, None) if v else (None, chosen)
+            pruned = True
+        return pruned
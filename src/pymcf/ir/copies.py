@@ -0,0 +1,167 @@
+"""
+复制传播和临时变量合并
+
+NumberLike 的运算结果保存在新建的临时变量中：`a + b` 展开为 `t = a; t += b`，`x = a + b + c` 还会产生临时变量之间的复制，
+以及复制到 x 的赋值。在每个块的操作序列中：
+
+- 合并：临时变量的值只用于复制到另一个变量时，产生该值的操作直接写入复制的目标，省略复制
+- 复制传播：复制之后读取复制结果的赋值和原地运算改为读取复制的来源，复制随之可能成为无用赋值，由无用赋值消除删除
+
+临时变量为候选变量（只在当前函数内部使用的局部变量）。合并到其他变量时目标变量被提前写入，期间不能有可能读取目标变量的
+Raw 命令和函数调用。复制传播只改写以 scoreboard players operation 读取来源的操作，与复制本身读取来源的方式相同。
+"""
+from typing import Any, Hashable
+
+from pymcf.ast_ import Raw, Assign, Inplace, compiler_hint
+from .codeblock import BasicBlock
+from .liveness import Liveness, op_fields, replace_fields
+
+
+class CopyCoalescer(Liveness):
+    """
+    在块内合并临时变量并传播复制，只替换块的操作列表，不修改操作对象
+    """
+
+    def apply(self) -> bool:
+        """
+        :return: 是否改变了操作
+        """
+        if not self.candidates or not self.blocks:
+            return False
+        live_out = self.liveness()
+        changed = False
+        for cb in self.blocks:
+            if not isinstance(cb, BasicBlock) or not self._ops[cb]:
+                continue
+            ops = self._coalesce(cb.ops, live_out[(cb, 0)])
+            ops = self._propagate(ops if ops is not None else cb.ops) or ops
+            if ops is not None:
+                cb.ops = ops
+                changed = True
+        return changed
+
+    def _coalesce(self, ops: list, live: int) -> list | None:
+        """
+        从后向前查找 `d = t`，t 在复制后不再活跃时，将 t 在块内最近一次完整赋值到复制之间的 t 替换为 d
+
+        :param live: 块的操作之后活跃的候选变量
+        :return: 新的操作列表，未改变时返回 None
+        """
+        ops = list(ops)
+        after = [0] * len(ops)  # 每个操作之后活跃的候选变量
+        for k in range(len(ops) - 1, -1, -1):
+            after[k] = live
+            _, uses, defs, _ = self._mask(ops[k])
+            live = uses | (live & ~defs)
+
+        changed = False
+        for i in range(len(ops) - 1, -1, -1):
+            op = ops[i]
+            if op is None:
+                continue
+            _, _, _, move = self._mask(op)
+            if not move or move & after[i]:
+                continue
+            target = op.target
+            key = self.key(target)
+            if key is None or key == self.key(op.value):
+                continue
+            start = self._def_start(ops, i, move, target, key)
+            if start is None:
+                continue
+
+            def rename(value):
+                return target if self._bit(value) & move else value
+
+            bit = self._bit(target)
+            for k in range(start, i):
+                o = ops[k]
+                if o is None:
+                    continue
+                _, uses, defs, _ = self._mask(o)
+                if (uses | defs) & move:
+                    reads, writes, is_assign = op_fields(type(o))
+                    o = replace_fields(o, {f: rename(getattr(o, f)) for f in (*reads, *writes)})
+                    if is_assign and self.key(o.target) == self.key(o.value):
+                        o = None  # 起始的赋值复制到自身，如 `t = x; t += 1; x = t`
+                    ops[k] = o
+                after[k] = (after[k] & ~move) | bit
+            ops[i] = None
+            changed = True
+        return [op for op in ops if op is not None] if changed else None
+
+    def _def_start(self, ops: list, i: int, tbit: int, target, key: Hashable) -> int | None:
+        """
+        :return: 复制之前 t 最近一次完整赋值（写入 t 且不读取 t）的位置，其间读写目标变量或可能观察到目标变量时返回 None
+        """
+        dbit = self._bit(target)
+        for k in range(i - 1, -1, -1):
+            o = ops[k]
+            if o is None or isinstance(o, compiler_hint):
+                continue
+            fields = op_fields(type(o))
+            if fields is None or isinstance(o, Raw):
+                if dbit:
+                    continue  # 函数调用和 Raw 不会引用候选变量
+                return None
+            _, uses, defs, _ = self._mask(o)
+            full = defs & tbit and not uses & tbit
+            if dbit:
+                read, write = uses & dbit, defs & dbit
+            else:
+                read = any(self.key(getattr(o, f)) == key for f in fields[0])
+                write = any(self.key(getattr(o, f)) == key for f in fields[1])
+            if write or (read and not (full and isinstance(o, Assign))):
+                # 其他操作的命令可能先写入目标再读取来源，如 UnaryOp.USub，完整赋值读取目标时只允许复制
+                return None
+            if full:
+                return k
+        return None
+
+    def _propagate(self, ops: list) -> list | None:
+        """
+        :return: 新的操作列表，未改变时返回 None
+        """
+        copies: dict[int, Any] = {}  # 复制结果的位 -> 复制来源
+        by_source: dict[Hashable, set[int]] = {}  # 来源的标识 -> 复制结果的位
+        external = 0  # 来源不是候选变量的复制结果，函数调用和 Raw 可能修改来源
+
+        def drop(bit):
+            source = copies.pop(bit)
+            by_source[self.key(source)].discard(bit)
+
+        res = []
+        changed = False
+        for op in ops:
+            fields = op_fields(type(op))
+            if fields is None or isinstance(op, Raw):
+                if external and not isinstance(op, compiler_hint):
+                    for bit in [b for b in copies if b & external]:
+                        drop(bit)
+                    external = 0
+                res.append(op)
+                continue
+
+            if copies and isinstance(op, Assign | Inplace):
+                source = copies.get(self._bit(op.value))
+                if source is not None:
+                    op = replace_fields(op, {"value": source})
+                    changed = True
+
+            for f in fields[1]:
+                key = self.key(getattr(op, f))
+                if key is None:
+                    continue
+                if (i := self._index.get(key)) is not None and 1 << i in copies:
+                    drop(1 << i)
+                for bit in list(by_source.get(key, ())):
+                    drop(bit)
+
+            if isinstance(op, Assign) and (bit := self._bit(op.target)):
+                key = self.key(op.value)
+                if key is not None and key != self.key(op.target):
+                    copies[bit] = op.value
+                    by_source.setdefault(key, set()).add(bit)
+                    external = external | bit if not self._bit(op.value) else external & ~bit
+            res.append(op)
+        return res if changed else None
@@ -0,0 +1,66 @@
+"""
+无用赋值消除
+
+NumberLike 的运算会创建临时变量，其中一些赋值在之后被覆盖或从未被读取。根据活跃变量分析的结果，
+删除写入的变量此后不再活跃的赋值、原地运算、一元运算和比较。
+
+只删除写入候选变量（只在当前函数内部使用的局部变量）的操作：Raw 和函数调用不会读取候选变量，
+写入其他变量的操作可能被函数外部观察到，均保持不变。
+"""
+from pymcf.ast_ import Assign, UnaryOp, Inplace, Compare
+from .codeblock import BasicBlock
+from .liveness import Liveness
+
+
+_REMOVABLE = (Assign, UnaryOp, Inplace, Compare)
+
+
+class DeadStoreEliminator(Liveness):
+    """
+    删除候选变量的无用赋值，重复至不再有操作被删除（删除的操作读取的变量可能随之变为不活跃）
+
+    只替换块的操作列表，不修改操作对象
+    """
+
+    def apply(self) -> bool:
+        """
+        :return: 是否删除了操作
+        """
+        if not self.candidates or not self.blocks:
+            return False
+        changed = False
+        while True:
+            live_out = self.liveness()
+            removed = False
+            for cb in self.blocks:
+                if not isinstance(cb, BasicBlock):
+                    continue
+                live = live_out[(cb, 0)]
+                items = self._ops[cb]
+                dead = set()
+                for i in range(len(items) - 1, -1, -1):
+                    op, uses, defs, _ = items[i]
+                    if defs and not defs & live and isinstance(op, _REMOVABLE):
+                        dead.add(i)
+                        continue
+                    live = uses | (live & ~defs)
+                if dead:
+                    self._remove(cb, items, dead)
+                    self._ops[cb] = [item for i, item in enumerate(items) if i not in dead]
+                    removed = True
+            if not removed:
+                return changed
+            changed = True
+
+    @staticmethod
+    def _remove(cb: BasicBlock, items: list[tuple], dead: set[int]):
+        # items 中的操作按顺序出现在 cb.ops 中（同一个操作可能出现多次），按位置对应
+        res = []
+        i = 0
+        for op in cb.ops:
+            if i < len(items) and items[i][0] is op:
+                i += 1
+                if i - 1 in dead:
+                    continue
+            res.append(op)
+        cb.ops = res
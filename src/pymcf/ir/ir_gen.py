@@ -1,10 +1,16 @@
 import ast
 from ast import NodeVisitor
-from collections import defaultdict
+from collections import defaultdict, deque
+from types import GeneratorType
 from typing import Any, Callable, Generator
 
+from pymcf import profiler
 from pymcf.config import Config
 from .codeblock import BasicBlock, MatchJump, JmpEq, code_block, IrBlockAttr
+from .slots import SlotAllocator
+from .dead_store import DeadStoreEliminator
+from .copies import CopyCoalescer
+from .constants import ConstantFolder
 from pymcf.ast_ import operation, Constructor, Block, compiler_hint, If, For, Try, Call, RtBaseExc, \
     RtStopIteration, RtContinue, RtBreak, Assign, Raise, While, RtBaseVar, Scope, With
 from ..ast_.runtime import RtReturn
@@ -28,14 +34,53 @@ class IrCfg(Config):
 
     ir_clear_bf: Callable
 
-    ir_simplify: int = 3
+    ir_simplify: int = 1
     """
-    应用 IR 流程简化算法的迭代次数。
+    大于 0 时应用 IR 流程简化算法（空块消除和块内联），简化至不动点。
+
+    之前的版本中该值为简化的迭代次数，现在大于 0 的值均表示启用，0 表示关闭。
+    """
+
+    ir_fold_constants: bool = True
+    """
+    是否进行常量传播和折叠
+
+    若启用，在编译期计算函数局部变量上结果已知的运算和比较，并删除条件已知时不会执行的分支。
+    """
+
+    ir_coalesce_copies: bool = True
+    """
+    是否合并临时变量并传播复制
+
+    若启用，运算结果只用于复制到另一个变量时直接写入该变量，读取复制结果的操作改为读取复制的来源。
+    """
+
+    ir_dead_store: bool = True
+    """
+    是否消除无用赋值
+
+    若启用，删除写入函数局部变量且之后不会被读取的赋值、运算和比较。
+    """
+
+    ir_reuse_slots: bool = True
+    """
+    是否复用函数局部计分板变量的槽位
+
+    若启用，对 IR 进行活跃变量分析，同一函数中生命周期不重叠的临时变量共用同一个计分板项。
     """
 
     ir_bf: RtBaseVar
 
 
+OPT_LEVELS: dict[int, dict[str, Any]] = {
+    0: {"ir_simplify": 0, "ir_inline_catch": False, "ir_fold_constants": False, "ir_coalesce_copies": False, "ir_dead_store": False, "ir_reuse_slots": False},
+    1: {"ir_simplify": 1, "ir_inline_catch": True, "ir_fold_constants": True, "ir_coalesce_copies": True, "ir_dead_store": True, "ir_reuse_slots": True},
+}
+"""
+各优化等级对应的 IR 编译配置，默认配置与最高等级相同
+"""
+
+
 class Expander(NodeVisitor):
 
     def __init__(self, block: Block, break_flag: Any, config: IrCfg, root_name: str = "root"):
@@ -114,8 +159,35 @@ class Expander(NodeVisitor):
         assert len(self.cb_stack) == 1
         return self.root
 
+    def visit(self, node: ast.AST):
+        """
+        以显式栈遍历语句树，避免深层嵌套时超出递归深度
+
+        visit_* 为生成器时，其 yield 的节点会在生成器继续执行前被访问完毕。
+        """
+        stack: list[GeneratorType] = []
+        while True:
+            method = getattr(self, "visit_" + node.__class__.__name__, self.generic_visit)
+            res = method(node)
+            if isinstance(res, GeneratorType):
+                stack.append(res)
+            while stack:
+                try:
+                    node = next(stack[-1])
+                    break
+                except StopIteration:
+                    stack.pop()
+            else:
+                return
+
     def visit_Block(self, node: Block):
-        super().generic_visit(node)
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        yield item
+            elif isinstance(value, ast.AST):
+                yield value
 
     def generic_visit(self, node: Any) -> Any:
         if isinstance(node, operation):
@@ -129,11 +201,11 @@ class Expander(NodeVisitor):
         cb_last_out = self.exit_block()
 
         cb_body_in = self.enter_block(name="if_body")
-        self.visit(node.blk_body)
+        yield node.blk_body
         cb_body_out = self.exit_block()
 
         cb_else_in = self.enter_block(name="if_else")
-        self.visit(node.blk_else)
+        yield node.blk_else
         cb_else_out = self.exit_block()
 
         cb_last_out.cond = node.condition
@@ -160,12 +232,12 @@ class Expander(NodeVisitor):
         cb_last_out = self.exit_block()
 
         cb_else_in = self.enter_block(name="for_else")
-        self.visit(node.blk_else)
+        yield node.blk_else
         cb_else_out = self.exit_block()
 
         cb_iter_in = self.enter_block(name="for_iter")
         self.push_exc_handler((RtStopIteration,), cb_else_in)
-        self.visit(node.blk_iter)
+        yield node.blk_iter
         self.pop_exc_handler()
         cb_iter_out = self.exit_block()
 
@@ -174,7 +246,7 @@ class Expander(NodeVisitor):
         cb_body_in = self.enter_block(name="for_body")
         self.push_exc_handler((RtContinue,), cb_iter_in)
         self.push_exc_handler((RtBreak,), cb_next_in)
-        self.visit(node.blk_body)
+        yield node.blk_body
         self.pop_exc_handler()
         self.pop_exc_handler()
         cb_body_out = self.exit_block()
@@ -227,19 +299,19 @@ class Expander(NodeVisitor):
         cb_next_in = self.enter_block(name="while_next")
 
         cb_cond_in = self.enter_block(name="while_cond")
-        self.visit(node.blk_cond)
+        yield node.blk_cond
         cb_cond_out = self.exit_block()
 
         cb_body_in = self.enter_block(name="while_body")
         self.push_exc_handler((RtContinue,), cb_body_in)
         self.push_exc_handler((RtBreak,), cb_next_in)
-        self.visit(node.blk_body)
+        yield node.blk_body
         self.pop_exc_handler()
         self.pop_exc_handler()
         cb_body_out = self.exit_block()
 
         cb_else_in = self.enter_block(name="while_else")
-        self.visit(node.blk_else)
+        yield node.blk_else
         cb_else_out = self.exit_block()
 
         if not self.inline_catch and node.blk_body.excs.might:
@@ -290,7 +362,7 @@ class Expander(NodeVisitor):
         cb_catch = BasicBlock(name="try_catch")
 
         cb_finally_in = self.enter_block(name="try_finally")
-        self.visit(node.blk_finally)
+        yield node.blk_finally
         cb_finally_out = self.exit_block()
 
         # 优先于 body 构造 handler 块，使 InlinedRaise 能够识别对应的块
@@ -302,13 +374,13 @@ class Expander(NodeVisitor):
                     captures.add(e)
 
             cb_exc_in = self.enter_block(name="try_except")
-            self.visit(exc_handler.blk_handle)
+            yield exc_handler.blk_handle
             cb_exc_out = self.exit_block()
             cb_exc_out.direct = cb_finally_in
             cb_excepts.append((cb_exc_in, exc_handler.eg, captures))
 
         cb_else_in = self.enter_block(name="try_else")
-        self.visit(node.blk_else)
+        yield node.blk_else
         cb_else_out = self.exit_block()
 
         cb_jump = MatchJump(self.bf, [
@@ -327,7 +399,7 @@ class Expander(NodeVisitor):
         cb_body_in = self.enter_block(name="try_body")
         for cb_exc_in, eg, _ in cb_excepts[::-1]:
             self.push_exc_handler(eg, cb_exc_in)
-        self.visit(node.blk_try)
+        yield node.blk_try
         for _ in range(len(cb_excepts)):
             self.pop_exc_handler()
         cb_body_out = self.exit_block()
@@ -389,15 +461,15 @@ class Expander(NodeVisitor):
         cb_last_out = self.exit_block()
 
         cb_enter_in = self.enter_block(name="with_enter")
-        self.visit(node.blk_enter)
+        yield node.blk_enter
         cb_enter_out = self.exit_block()
 
         cb_body_in = self.enter_block(name="with_body")
-        self.visit(node.blk_body)
+        yield node.blk_body
         cb_body_out = self.exit_block()
 
         cb_exit_in = self.enter_block(name="with_exit")
-        self.visit(node.blk_exit)
+        yield node.blk_exit
         cb_exit_out = self.exit_block()
 
         cb_next_in = self.enter_block(name="with_next")
@@ -426,64 +498,158 @@ class Expander(NodeVisitor):
 
 
 class CBSimplifier:
+    """
+    流程块简化器
+
+    维护每个块的前驱及引用计数，以工作表的方式对块应用 simplify_* 规则直到不动点。
+    规则就地修改块并返回替代块（返回块自身表示不替代，入口块不会被替代）；
+    块发生变化后只重新检查它本身及其前驱，引用计数归零的块随即被移除。
+    """
 
     def __init__(self, root: code_block):
         self.simplified = False
+        self.root = root
         self._blocks: list[code_block] = [root]
-        self._ref_num = defaultdict(int)
+        self._ref_num: dict[code_block, int] = defaultdict(int)
         self._list_all()
 
     def _mark_simplified(self):
         self.simplified = True
 
     def _list_all(self):
+        """
+        按深度优先前序列出从入口块可达的所有块
+        """
         root = self._blocks[0]
         self._blocks.clear()
-
-        def visit(node):
-            if node is None or self._ref_num[node] > 1:
-                return
-            self._blocks.append(node)
-            i = getattr(self, "iter_" + node.__class__.__name__, None)(node)
-            try:
-                node = next(i)
-                while True:
-                    self._ref_num[node] += 1
-                    visit(node)
-                    node = i.send(node)
-            except StopIteration:
-                pass
-
-        visit(root)
+        self._blocks.append(root)
+        visited = {root}
+        stack = [iter(self._edges(root))]
+        while stack:
+            for node in stack[-1]:
+                if node not in visited:
+                    visited.add(node)
+                    self._blocks.append(node)
+                    stack.append(iter(self._edges(node)))
+                    break
+            else:
+                stack.pop()
 
     def _count_ref(self):
         self._ref_num.clear()
+        self._preds: dict[code_block, dict[code_block, int]] = defaultdict(dict)
         for block in self._blocks:
-            i = getattr(self, "iter_" + block.__class__.__name__, None)(block)
-            try:
-                node = next(i)
-                while True:
-                    if node is not None:
-                        self._ref_num[node] += 1
-                    node = i.send(node)
-            except StopIteration:
-                pass
+            for node in self._edges(block):
+                self._link(block, node)
+
+    def _edges(self, block: code_block) -> list[code_block]:
+        if isinstance(block, BasicBlock):
+            return [node for node in (block.direct, block.true, block.false) if node is not None]
+        res = []
+        i = getattr(self, "iter_" + block.__class__.__name__, None)(block)
+        try:
+            node = next(i)
+            while True:
+                if node is not None:
+                    res.append(node)
+                node = i.send(node)
+        except StopIteration:
+            pass
+        return res
+
+    def _redirect(self, block: code_block, old: code_block, new: code_block | None):
+        i = getattr(self, "iter_" + block.__class__.__name__, None)(block)
+        try:
+            node = next(i)
+            while True:
+                node = i.send(new if node is old else node)
+        except StopIteration:
+            pass
+
+    def _link(self, pred: code_block, block: code_block):
+        preds = self._preds[block]
+        preds[pred] = preds.get(pred, 0) + 1
+        self._ref_num[block] += 1
+
+    def _unlink(self, pred: code_block, block: code_block):
+        dead = [(pred, block)]
+        while dead:
+            pred, block = dead.pop()
+            preds = self._preds[block]
+            preds[pred] -= 1
+            if preds[pred] == 0:
+                del preds[pred]
+            self._ref_num[block] -= 1
+            if self._ref_num[block] == 0 and block is not self.root:
+                # 不再被引用的块被移除，其后继的引用计数随之减少
+                self._dead.add(block)
+                dead.extend((block, node) for node in self._edges(block))
+            elif self._ref_num[block] == 1:
+                self._push(*preds)
+
+    def _update_edges(self, block: code_block, old_edges: list[code_block]):
+        # 先增加新引用再减少旧引用，避免仍被引用的块被误删
+        for node in self._edges(block):
+            self._link(block, node)
+        for node in old_edges:
+            self._unlink(block, node)
+
+    def _push(self, *blocks: code_block):
+        for block in blocks:
+            if block not in self._queued:
+                self._queued.add(block)
+                self._work.append(block)
 
-    def simplify(self):
-        mapping = {}
-        for block in self._blocks:
-            if block is not None:
-                simplifier = getattr(self, "simplify_" + block.__class__.__name__)
-                mapping[block] = simplifier(block)
-        for block in self._blocks:
-            i: Generator = getattr(self, "iter_" + block.__class__.__name__, None)(block)
-            try:
-                node = next(i)
-                while True:
-                    node = i.send(mapping[node] if node is not None else None)
-            except StopIteration:
-                pass
-        return self._blocks[0]
+    @staticmethod
+    def _state(block: code_block) -> tuple[tuple, Any, tuple]:
+        """
+        :return: (块的大小, 跳转条件, 跳转目标)
+        """
+        if isinstance(block, BasicBlock):
+            return (len(block.ops), len(block.attributes)), block.cond, (block.direct, block.true, block.false)
+        elif isinstance(block, MatchJump):
+            return (len(block.cases), ), block.flag, tuple(c.target for c in block.cases)
+        return (), None, ()
+
+    @staticmethod
+    def _same_state(a: tuple[tuple, Any, tuple], b: tuple[tuple, Any, tuple]) -> bool:
+        # 条件可能是重载了比较运算的运行期量，只比较对象标识
+        return a[0] == b[0] and a[1] is b[1] and all(x is y for x, y in zip(a[2], b[2]))
+
+    def simplify(self) -> code_block:
+        self._count_ref()
+        self._dead: set[code_block] = set()
+        self._work: deque[code_block] = deque()
+        self._queued: set[code_block] = set()
+        self._push(*self._blocks)
+
+        while self._work:
+            block = self._work.popleft()
+            self._queued.discard(block)
+            if block in self._dead:
+                continue
+
+            state = self._state(block)
+            replacement = getattr(self, "simplify_" + block.__class__.__name__)(block)
+            if not self._same_state(state, self._state(block)):
+                self._mark_simplified()
+                self._update_edges(block, [node for node in state[2] if node is not None])
+                self._push(block, *self._preds[block])
+
+            if replacement is not block and block is not self.root and block not in self._dead:
+                self._replace(block, replacement)
+        return self.root
+
+    def _replace(self, block: code_block, replacement: code_block | None):
+        """
+        将所有指向 block 的跳转改为指向 replacement，block 随后被移除
+        """
+        self._mark_simplified()
+        for pred in list(self._preds[block]):
+            edges = self._edges(pred)
+            self._redirect(pred, block, replacement)
+            self._update_edges(pred, edges)
+            self._push(pred, *self._preds[pred])
 
     def iter_BasicBlock(self, node: BasicBlock):
         node.direct = yield node.direct
@@ -517,36 +683,29 @@ class EmptyCBRemover(CBSimplifier):
 
         if cb.true is None and cb.false is None:
             cb.cond = None
-            self._mark_simplified()
         elif cb.cond is None:
             cb.true = cb.false = None
-            self._mark_simplified()
 
-        if cb.cond is None and isinstance(cb.direct, BasicBlock) and self.is_empty(cb.direct):
+        if cb.cond is None and isinstance(cb.direct, BasicBlock) and cb.direct is not cb and self.is_empty(cb.direct):
             # 当前块直接跳转空块且无条件跳转，将空块的跳转方式提前
             cb.cond = cb.direct.cond
             cb.false = cb.direct.false
             cb.true = cb.direct.true
             cb.direct = cb.direct.direct
-            self._mark_simplified()
-        if self.is_empty(cb) and cb.cond is None:
+        if self.is_empty(cb) and cb.cond is None and cb.direct is not cb:
             # 不应存在全空的环路
-            self._mark_simplified()
             return cb.direct
         if cb.cond is not None:
             # 跳过相同条件的空块
             if isinstance(cb.true, BasicBlock) and cb.true.cond is cb.cond and self.is_empty(cb.true) and cb.true.direct is None:
                 cb.true = cb.true.true
-                self._mark_simplified()
             if isinstance(cb.false, BasicBlock) and cb.false.cond is cb.cond and self.is_empty(cb.false) and cb.false.direct is None:
                 cb.false = cb.false.false
-                self._mark_simplified()
         return cb
 
     def simplify_MatchJump(self, cb: MatchJump) -> code_block | None:
         # target 为 None 的 case 不能删除，需要保留其匹配截断的逻辑
         if len(cb.cases) == 0:
-            self._mark_simplified()
             return None
         return cb
 
@@ -556,21 +715,21 @@ class CBInliner(CBSimplifier):
     def __init__(self, root: code_block, inline_thresh: int):
         super().__init__(root)
         self.inline_threshold = inline_thresh
-
-    def simplify(self):
-        self._count_ref()
-        return super().simplify()
+        self._inlined: dict[code_block, set[code_block]] = defaultdict(set)  # 被复制内联过的块，避免在环路中反复内联
 
     def simplify_BasicBlock(self, cb: BasicBlock) -> code_block | None:
-        if cb.cond is None and isinstance(cb.direct, BasicBlock) and len(cb.direct.attributes) == 0:
-            if (self.inline_threshold >= 0 and self._ref_num[cb.direct] == 1) or len(cb.direct.ops) <= self.inline_threshold:
-                # cb.direct 不会是 cb
-                cb.cond = cb.direct.cond
-                cb.false = cb.direct.false
-                cb.true = cb.direct.true
-                cb.ops.extend(cb.direct.ops)
-                cb.direct = cb.direct.direct
-                self._mark_simplified()
+        if cb.cond is None and isinstance(cb.direct, BasicBlock) and cb.direct is not cb and len(cb.direct.attributes) == 0:
+            if self.inline_threshold >= 0 and self._ref_num[cb.direct] == 1:
+                pass
+            elif len(cb.direct.ops) <= self.inline_threshold and cb.direct not in self._inlined[cb]:
+                self._inlined[cb].add(cb.direct)
+            else:
+                return cb
+            cb.cond = cb.direct.cond
+            cb.false = cb.direct.false
+            cb.true = cb.direct.true
+            cb.ops.extend(cb.direct.ops)
+            cb.direct = cb.direct.direct
         return cb
 
 
@@ -580,21 +739,45 @@ class Compiler:
         self.config = config
 
     def compile(self, ctx: Scope) -> list[code_block]:
-        cb = Expander(ctx._root_block, self.config.ir_bf, self.config, ctx.name).expand()
-
-        for _ in range(self.config.ir_simplify):
-            simplifier = EmptyCBRemover(cb)
-            cb = simplifier.simplify()
-            if cb is None:
-                return []
-            if not simplifier.simplified:
-                break
-
-        for _ in range(self.config.ir_simplify):
-            inliner = CBInliner(cb, self.config.ir_inline_threshold)
-            cb = inliner.simplify()
-            if not inliner.simplified:
-                break
+        with profiler.phase("expand", ctx.name):
+            cb = Expander(ctx._root_block, self.config.ir_bf, self.config, ctx.name).expand()
+
+        if self.config.ir_simplify > 0:
+            cb = self._simplify(cb, ctx.name)
 
         collector = CBSimplifier(cb)
-        return collector._blocks
\ No newline at end of file
+        blocks = collector._blocks
+
+        private = getattr(ctx, "private_locals", None)
+        if private:
+            candidates = [ctx.locals[i] for i in private]
+            masks = {}
+            if self.config.ir_fold_constants:
+                with profiler.phase("constants", ctx.name):
+                    pruned = ConstantFolder(blocks, candidates, ctx.var_key).apply()
+                if pruned:
+                    if self.config.ir_simplify > 0:
+                        # 删除分支后被选择的分支可以内联
+                        cb = self._simplify(cb, ctx.name)
+                    blocks = CBSimplifier(cb)._blocks  # 被删除的分支不再可达，不输出
+            if self.config.ir_coalesce_copies:
+                with profiler.phase("coalesce", ctx.name):
+                    CopyCoalescer(blocks, candidates, ctx.var_key, masks).apply()
+            if self.config.ir_dead_store:
+                with profiler.phase("dead_store", ctx.name):
+                    removed = DeadStoreEliminator(blocks, candidates, ctx.var_key, masks).apply()
+                if removed and self.config.ir_simplify > 0:
+                    # 删除操作后可能产生新的空块
+                    cb = self._simplify(cb, ctx.name)
+                    blocks = CBSimplifier(cb)._blocks
+            if self.config.ir_reuse_slots:
+                with profiler.phase("slots", ctx.name):
+                    SlotAllocator(blocks, candidates, ctx.var_key, masks).apply()
+        return blocks
+
+    def _simplify(self, cb: code_block, name: str) -> code_block:
+        with profiler.phase("simplify.empty", name):
+            cb = EmptyCBRemover(cb).simplify()
+
+        with profiler.phase("simplify.inline", name):
+            return CBInliner(cb, self.config.ir_inline_threshold).simplify()
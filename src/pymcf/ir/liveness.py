@@ -0,0 +1,365 @@
+"""
+函数局部变量的活跃变量分析
+
+只在函数内部使用的局部变量（不作为参数、返回值，不在 Raw 或其他函数中出现）的值不会被函数外部观察到，
+可以根据其在 IR 中的活跃范围复用槽位或删除无用的赋值。Raw 中的文本组件等命令对象持有的计分板项引用同样视为出现在 Raw 中。
+
+IR 的流程块以函数调用的方式执行：块执行完 ops 后调用 direct 块，direct 块（及其后续块）返回后再判断 cond
+并调用 true 或 false 块。分析时每个块拆分为 ops、cond 和结束三个节点，调用关系按上下文无关的方式连接，
+结果是实际执行路径的超集，因而是保守的。带有 execute 属性的块可能执行零次或多次，按循环处理。
+"""
+from ast import AST
+from functools import cache
+from typing import Any, Callable, Hashable
+
+from pymcf.ast_ import Raw, FormattedData, Resolvable, RtBaseVar, Block, operation, Assign, Call, Scope
+from .codeblock import code_block, BasicBlock, MatchJump, IrBlockAttr
+
+
+VarKey = Callable[[Any], Hashable | None]
+"""
+变量的标识，同一个变量可能由多个运行期量对象表示（如指向同一计分板项的 Score 和命令中的 ScoreRef），
+返回 None 表示不参与分析
+"""
+
+
+class _References:
+    """
+    语句树中引用的变量和调用的 scope
+    """
+
+    def __init__(self, key: VarKey):
+        self.key = key
+        # id(字段值) -> (字段值, 其中变量的标识)，同一对象通常被多次引用，同时保存字段值以保证 id 不被复用
+        self._keys: dict[int, tuple[Any, tuple]] = {}
+
+    def _var_keys(self, value) -> tuple:
+        item = self._keys.get(id(value))
+        if item is None:
+            res = []
+            if isinstance(value, RtBaseVar):
+                # 迭代器等复合运行期量内部持有的运行期量
+                for v in (value, *(v for v in getattr(value, "__dict__", {}).values() if isinstance(v, RtBaseVar))):
+                    if (k := self.key(v)) is not None:
+                        res.append(k)
+            elif isinstance(value, Resolvable):
+                res = self._resolvable_keys(value)
+            item = self._keys[id(value)] = value, tuple(res)
+        return item[1]
+
+    def _resolvable_keys(self, value: Resolvable) -> list:
+        """
+        文本组件等命令对象在生成命令时才解析，遍历其持有的对象，找出其中的运行期量和计分板项引用
+        """
+        res = []
+        seen = set()
+        stack = [value]
+        while stack:
+            v = stack.pop()
+            if id(v) in seen:
+                continue
+            seen.add(id(v))
+            if isinstance(v, RtBaseVar):
+                res.extend(self._var_keys(v))
+            elif (k := self.key(v)) is not None:
+                res.append(k)
+            elif isinstance(v, dict):
+                stack.extend(v.values())
+            elif isinstance(v, list | tuple | set | frozenset):
+                stack.extend(v)
+            elif not isinstance(v, AST | Scope | type) and hasattr(v, "__dict__"):
+                stack.extend(vars(v).values())
+        return res
+
+    def scan(self, block: Block) -> tuple[set, set, set]:
+        """
+        :return: (引用的变量, 在 Raw 或块属性中引用的变量, 调用的 scope)
+        """
+        refs = set()
+        raw = set()
+        callees = set()
+        keys = self._keys
+
+        def add_raw(parts):
+            for part in parts:
+                if ks := self._var_keys(part.data if isinstance(part, FormattedData) else part):
+                    refs.update(ks)
+                    raw.update(ks)
+
+        stack: list[AST] = [block]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Raw):
+                add_raw(node.code)
+                continue
+            if isinstance(node, IrBlockAttr):
+                for value in node.attr.values():
+                    add_raw(value if isinstance(value, tuple) else (value, ))
+                continue
+            if isinstance(node, Call) and isinstance(node.func, Scope):
+                callees.add(node.func)
+            for field in node._fields:
+                value = getattr(node, field, None)
+                for v in value if isinstance(value, list | tuple) else (value, ):
+                    if isinstance(v, AST):
+                        stack.append(v)
+                    elif ks := (item[1] if (item := keys.get(id(v))) is not None else self._var_keys(v)):
+                        refs.update(ks)
+        return refs, raw, callees
+
+
+def recursive_scopes(callees: dict[Scope, set[Scope]]) -> set[Scope]:
+    """
+    直接或间接调用自身的 scope（调用图中的环），不在 callees 中的 scope 视为不调用其他 scope
+    """
+    index: dict[Scope, int] = {}
+    low: dict[Scope, int] = {}
+    on_stack: set[Scope] = set()
+    stack: list[Scope] = []
+    res: set[Scope] = set()
+
+    def visit(scope):
+        index[scope] = low[scope] = len(index)
+        stack.append(scope)
+        on_stack.add(scope)
+        work.append((scope, iter(callees.get(scope, ()))))
+
+    for root in callees:
+        if root in index:
+            continue
+        work = []
+        visit(root)
+        while work:
+            node, it = work[-1]
+            for callee in it:
+                if callee not in index:
+                    visit(callee)
+                    break
+                elif callee in on_stack:
+                    low[node] = min(low[node], index[callee])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        s = stack.pop()
+                        on_stack.discard(s)
+                        component.append(s)
+                        if s is node:
+                            break
+                    if len(component) > 1 or node in callees.get(node, ()):
+                        res.update(component)
+    return res
+
+
+def private_locals(scopes: list[Scope], key: VarKey) -> dict[Scope, list[int]]:
+    """
+    找出各 scope 中可以复用槽位的局部变量：key 不为 None，只在 scope 自身的语句树中被引用且不出现在 Raw 中
+    （包括 Raw 中的文本组件等命令对象持有的计分板项引用）。
+    递归调用的 scope 中变量的值可能跨越自身的调用，不进行复用
+    :return: scope -> 变量在 scope.locals 中的下标
+    """
+    owners: dict[Hashable, Scope | None] = {}
+    raw = set()
+    callees = {}
+    references = _References(key)
+    for scope in scopes:
+        refs, r, callees[scope] = references.scan(scope._root_block)
+        raw |= r
+        for k in refs:
+            owners[k] = scope if owners.get(k, scope) is scope else None
+
+    recursive = recursive_scopes(callees)
+    res = {}
+    for scope in scopes:
+        if scope in recursive:
+            continue
+        res[scope] = [
+            i for i, v in enumerate(scope.locals)
+            if (k := key(v)) is not None and k not in raw and owners.get(k) is scope
+        ]
+    return res
+
+
+@cache
+def op_fields(typ: type) -> tuple[tuple[str, ...], tuple[str, ...], bool] | None:
+    """
+    操作类型读取和写入的字段，以及是否为赋值，不是操作时返回 None
+    """
+    if not issubclass(typ, operation):
+        return None
+    return typ._reads, typ._writes, issubclass(typ, Assign)
+
+
+def replace_fields(op: operation, changes: dict[str, Any]) -> operation:
+    """
+    复制操作并替换其中的字段。操作属于语句树，监视模式下会在之后的构建中复用，不能直接修改
+    """
+    res = type(op).__new__(type(op))
+    for k in op._fields:
+        setattr(res, k, changes[k] if k in changes else getattr(op, k))
+    res._cache = None
+    return res
+
+
+class Liveness:
+    """
+    候选变量的活跃变量分析
+
+    候选变量应只在当前 scope 的 IR 中被引用（不作为参数、返回值或在 Raw 中出现），其余变量不参与分析。
+    """
+
+    def __init__(self, blocks: list[code_block], candidates: list[RtBaseVar], key: VarKey, masks: dict | None = None):
+        """
+        :param masks: 操作读写候选变量的缓存，候选变量相同的多次分析可以共享
+        """
+        self.blocks = blocks
+        self.candidates = candidates
+        self.key = key
+        self._index = {key(v): i for i, v in enumerate(candidates)}
+        self._bits: dict[int, int] = {}  # id(值) -> 对应的位，不是候选变量时为 0
+        # id(操作) -> (操作, 读取, 写入, 复制来源)，内联后同一个操作可能出现在多个块中
+        self.masks: dict[int, tuple[operation, int, int, int]] = {} if masks is None else masks
+        # 块 -> [(操作, 读取, 写入, 复制来源)]，只包含读写候选变量的操作
+        self._ops: dict[code_block, list[tuple[operation, int, int, int]]] = {}
+        self._succ: dict[tuple, list[tuple]] = {}
+        self._preds: dict[tuple, list[tuple]] = {}
+        self._live_in: dict[tuple, int] = {}
+
+    def _bit(self, value) -> int:
+        bit = self._bits.get(id(value))
+        if bit is None:
+            i = self._index.get(self.key(value))
+            bit = self._bits[id(value)] = 0 if i is None else 1 << i
+        return bit
+
+    def _mask(self, op) -> tuple[operation, int, int, int]:
+        """
+        :return: (操作, 读取, 写入, 复制来源)
+        """
+        item = self.masks.get(id(op))
+        if item is None:
+            fields = op_fields(type(op))
+            uses = defs = 0
+            if fields is not None:
+                for k in fields[0]:
+                    uses |= self._bit(getattr(op, k))
+                for k in fields[1]:
+                    defs |= self._bit(getattr(op, k))
+            item = self.masks[id(op)] = op, uses, defs, uses if fields is not None and fields[2] else 0
+        return item
+
+    def _collect_ops(self):
+        cache = self.masks
+        for cb in self.blocks:
+            if not isinstance(cb, BasicBlock):
+                continue
+            ops = []
+            for op in cb.ops:
+                item = cache.get(id(op))
+                if item is None:
+                    item = self._mask(op)
+                if item[1] or item[2]:
+                    ops.append(item)
+            self._ops[cb] = ops
+
+    def _build_graph(self):
+        """
+        构建流图，节点为 (块, 0: ops | 1: cond | 2: 结束)
+
+        函数可能被再次调用，入口块结束后连接到入口块，入口处活跃的变量（可能在赋值前被读取）在函数结束时同样活跃
+        """
+        succ: dict[tuple, list[tuple]] = {}
+
+        def edge(a, b):
+            succ.setdefault(a, []).append(b)
+
+        def call(site, target: code_block, ret):
+            edge(site, (target, 0))
+            edge((target, 2), ret)
+            if target.attributes.get("execute") is not None:
+                edge(site, ret)
+                edge((target, 2), (target, 0))
+
+        for cb in self.blocks:
+            for node in ((cb, 0), (cb, 1), (cb, 2)):
+                succ.setdefault(node, [])
+            if isinstance(cb, BasicBlock):
+                if cb.direct is not None:
+                    call((cb, 0), cb.direct, (cb, 1))
+                else:
+                    edge((cb, 0), (cb, 1))
+                branches = [t for t in (cb.true, cb.false) if t is not None] if cb.cond is not None else []
+                for target in branches:
+                    call((cb, 1), target, (cb, 2))
+                if len(branches) < 2:
+                    edge((cb, 1), (cb, 2))
+            elif isinstance(cb, MatchJump):
+                edge((cb, 0), (cb, 1))
+                for case in cb.cases:
+                    if case.target is not None:
+                        call((cb, 1), case.target, (cb, 2))
+                edge((cb, 1), (cb, 2))
+            else:
+                edge((cb, 0), (cb, 1))
+                edge((cb, 1), (cb, 2))
+        if self.blocks:
+            edge((self.blocks[0], 2), (self.blocks[0], 0))
+        return succ
+
+    def _summaries(self) -> dict[tuple, tuple[int, int]]:
+        """
+        :return: 节点 -> (读取, 写入)
+        """
+        res = {}
+        for cb in self.blocks:
+            if isinstance(cb, BasicBlock):
+                uses = defs = 0
+                for _, u, d, _ in reversed(self._ops[cb]):
+                    uses = u | (uses & ~d)
+                    defs |= d
+                res[(cb, 0)] = (uses, defs)
+                res[(cb, 1)] = (self._bit(cb.cond), 0)
+            elif isinstance(cb, MatchJump):
+                res[(cb, 1)] = (self._bit(cb.flag), 0)
+        return res
+
+    def liveness(self) -> dict[tuple, int]:
+        """
+        :return: 节点 -> 节点之后活跃的变量
+        """
+        if not self._succ:
+            self._collect_ops()
+            self._succ = self._build_graph()
+            self._preds = {node: [] for node in self._succ}
+            for node, targets in self._succ.items():
+                for t in targets:
+                    self._preds[t].append(node)
+        succ = self._succ
+        preds = self._preds
+        summaries = self._summaries()
+
+        live_in = dict.fromkeys(succ, 0)
+        live_out = dict.fromkeys(succ, 0)
+        work = list(succ)
+        queued = set(work)
+        while work:
+            node = work.pop()
+            queued.discard(node)
+            out = 0
+            for t in succ[node]:
+                out |= live_in[t]
+            live_out[node] = out
+            uses, defs = summaries.get(node, (0, 0))
+            new = uses | (out & ~defs)
+            if new != live_in[node]:
+                live_in[node] = new
+                for p in preds[node]:
+                    if p not in queued:
+                        queued.add(p)
+                        work.append(p)
+        self._live_in = live_in
+        return live_out
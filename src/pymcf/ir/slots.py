@@ -0,0 +1,109 @@
+"""
+计分板槽位复用
+
+函数中的每个临时计分板变量（$var_*）在数据包中各占一个计分板项。根据活跃变量分析的结果，
+生命周期不重叠的变量共用同一个计分板项（类似寄存器分配）。
+"""
+from typing import Callable, Hashable
+
+from pymcf.ast_ import RtBaseVar, operation
+from .codeblock import BasicBlock, MatchJump
+from .liveness import Liveness, op_fields, replace_fields
+
+
+class SlotAllocator(Liveness):
+    """
+    为候选变量分配计分板槽位
+
+    在函数入口处仍然活跃的候选变量（可能在赋值前被读取）保留原有的计分板项。
+    """
+
+    def allocate(self) -> dict[Hashable, RtBaseVar]:
+        """
+        :return: 变量的标识 -> 替代的变量，未改变的变量不在结果中
+        """
+        if not self.candidates or not self.blocks:
+            return {}
+        live_out = self.liveness()
+        pinned = self._live_in[(self.blocks[0], 0)]
+
+        # 写入变量时与此后活跃的变量冲突（复制的来源除外），冲突只记录在写入的一方。
+        # 操作在此之后不再读取的操作数不与目标冲突，可能与目标共用槽位：后端翻译操作时须先读取操作数再写入目标，
+        # 先写入目标的翻译（如取负先将目标设为 0）须处理目标与操作数为同一计分板项的情况
+        conflicts = [0] * len(self.candidates)
+        for cb in self.blocks:
+            if not isinstance(cb, BasicBlock):
+                continue
+            live = live_out[(cb, 0)]
+            for _, uses, defs, move in reversed(self._ops[cb]):
+                if defs:
+                    others = live & ~defs & ~move
+                    d = defs
+                    while d:
+                        low = d & -d
+                        conflicts[low.bit_length() - 1] |= others
+                        d ^= low
+                live = uses | (live & ~defs)
+
+        # 按创建顺序贪心分配，槽位使用其中第一个变量的计分板项
+        slots: list[list[int]] = []  # [代表变量, 成员, 成员的冲突]
+        res = {}
+        for i, var in enumerate(self.candidates):
+            bit = 1 << i
+            if pinned & bit:
+                continue
+            for slot in slots:
+                if not (conflicts[i] & slot[1]) and not (slot[2] & bit):
+                    slot[1] |= bit
+                    slot[2] |= conflicts[i]
+                    res[self.key(var)] = self.candidates[slot[0]]
+                    break
+            else:
+                slots.append([i, bit, conflicts[i]])
+        return res
+
+    def apply(self):
+        """
+        将块中的变量替换为分配的槽位，替换后复制到自身的赋值被省略
+
+        只替换块的操作列表和条件，不修改操作对象：操作属于语句树，监视模式下会在之后的构建中复用
+        """
+        slots = self.allocate()
+        if not slots:
+            return
+        renamed = 0
+        for k in slots:
+            renamed |= 1 << self._index[k]
+
+        slot_of: dict[int, RtBaseVar] = {}
+
+        def slot(value):
+            if not self._bit(value) & renamed:
+                return value
+            res = slot_of.get(id(value))
+            if res is None:
+                res = slot_of[id(value)] = slots[self.key(value)]
+            return res
+
+        replaced: dict[int, operation | None] = {}  # 内联后同一个操作可能出现在多个块中
+        for cb in self.blocks:
+            if isinstance(cb, BasicBlock):
+                for op, uses, defs, _ in self._ops[cb]:
+                    if (uses | defs) & renamed and id(op) not in replaced:
+                        replaced[id(op)] = self._rename(op, slot)
+                if replaced:
+                    cb.ops = [
+                        replaced.get(id(op), op) for op in cb.ops
+                        if id(op) not in replaced or replaced[id(op)] is not None
+                    ]
+                cb.cond = slot(cb.cond)
+            elif isinstance(cb, MatchJump):
+                cb.flag = slot(cb.flag)
+
+    def _rename(self, op: operation, slot: Callable) -> operation | None:
+        reads, writes, is_assign = op_fields(type(op))
+        if is_assign:
+            target = slot(op.target)
+            if self._bit(target) and self.key(target) == self.key(slot(op.value)):
+                return None
+        return replace_fields(op, {k: slot(getattr(op, k)) for k in (*reads, *writes)})
@@ -4,8 +4,9 @@ from typing import SupportsInt, Self
 
 from .commands import Command, RawCommand, OpAssign, Execute, ExecuteChain, DataGet, \
     SetConst, OpSub, NumRange, OpMul, OpAdd, OpDiv, OpMod, AddConst, RemConst, Function, NSName, ReturnRun, GetValue, \
-    ResetValue, AtS, ReturnValue, EntityReference, DataModifyFrom, DataModifyValue, DataRemove
+    ResetValue, AtS, ReturnValue, EntityReference, DataModifyFrom, DataModifyValue, DataRemove, ScoreRef
 from .scope import MCFScope
+from ..config import Config
 from ..ast_ import compiler_hint, operation, Raw, Assign, UnaryOp, Inplace, Compare, LtE, Gt, GtE, Eq, NotEq, Lt, UAdd, USub, Not, \
     Invert, And, Or, Add, Sub, Mult, Div, FloorDiv, Mod, RtBaseExc, Call
 from ..ast_.runtime import _RtBaseExcMeta
@@ -15,6 +16,7 @@ from ..ir.codeblock import JmpEq, JmpNotEq
 
 
 class NbtNumberScale(compiler_hint):
+    __slots__ = ("scale", )
     _attributes = ('scale',)
     def __init__(self, scale=None, **__):
         self.scale = scale  # None for reset
@@ -104,10 +106,29 @@ class MCF:
         return '\n'.join(cmd.resolve(self.scope) for cmd in self.cmds)
 
 
+class TranslatorCfg(Config):
+
+    mc_const_op_cost: int = 1
+    """
+    与常量进行乘除和取模时，读取 $const 计分板项的运算本身的代价，以命令条数计
+    """
+
+    mc_const_load_cost: int = 2
+    """
+    函数中尚未使用的常量的加载代价，以命令条数计：常量需要在加载函数中初始化并占用一个计分板项。
+
+    强度削减（如乘 2 改为自加）生成的命令条数不超过读取常量的运算的代价（常量尚未使用时加上加载代价）时使用强度削减，
+    默认情况下乘 3、乘 4、乘 8 和乘 -1 等展开。增大加载代价可以减少常量计分板项，代价是每次执行时更多的命令。
+    """
+
+
 class Translator:
 
-    def __init__(self, scope: MCFScope):
+    def __init__(self, scope: MCFScope, config: Config = None):
         self.scope = scope
+        config = config or Config()
+        self.const_op_cost = config.mc_const_op_cost
+        self.const_load_cost = config.mc_const_load_cost
         self.scales = [1]  # 由相关的 compiler_hint 修改，控制 nbt 读取 / 写入时的 scale
 
     @property
@@ -130,6 +151,54 @@ class Translator:
             else:
                 return Function(cb)
 
+    def negate(self, target: ScoreRef) -> list[Command]:
+        """
+        target = -target，operation 命令的结果为运算后目标的值
+        """
+        tmp = self.scope.tmp_score.__metadata__
+        return [SetConst(tmp, 0), ExecuteChain().store('result').score(target).run(OpSub(tmp, target))]
+
+    def reduce_strength(self, op: Mult | Div | FloorDiv | Mod, target: ScoreRef, value: int) -> list[Command] | None:
+        """
+        与常量的乘除和取模改写为不读取 $const 计分板项的命令：
+
+        - 乘 0 设置为 0，乘 1 省略，乘 -1 取反，其余乘数按二进制位展开为自加和加上原值（负数先取反）
+        - 除以 1 省略，除以 -1 取反，对 1 和 -1 取模设置为 0
+
+        计分板运算按 32 位整数溢出，展开后的结果与乘法相同
+
+        :return: 命令条数超过读取常量的运算的代价（常量尚未使用时加上 mc_const_load_cost）或无法改写时返回 None
+        """
+        cost = self.const_op_cost if value in self.scope.consts else self.const_op_cost + self.const_load_cost
+        match op:
+            case Mult():
+                if value == 0:
+                    return [SetConst(target, 0)]
+                cmds = []
+                if value < 0:
+                    cmds.extend(self.negate(target))
+                    value = -value
+                if value.bit_count() > 1:
+                    tmp = self.scope.tmp_score.__metadata__
+                    cmds.append(OpAssign(tmp, target))
+                for i in range(value.bit_length() - 2, -1, -1):
+                    cmds.append(OpAdd(target, target))
+                    if value >> i & 1:
+                        cmds.append(OpAdd(target, tmp))
+            case Div() | FloorDiv():
+                if value == 1:
+                    return []
+                if value != -1:
+                    return None
+                cmds = self.negate(target)
+            case Mod():
+                if value not in (1, -1):
+                    return None
+                cmds = [SetConst(target, 0)]
+            case _:
+                return None
+        return cmds if len(cmds) <= cost else None
+
     def translate_op(self, op: operation) -> Command | list[Command]:
         if isinstance(op, Raw):
             return RawCommand(op.code)
@@ -190,6 +259,9 @@ class Translator:
                         case UAdd():
                             return OpAssign(target.__metadata__, value.__metadata__)
                         case USub():
+                            if (key := self.scope.var_key(target)) is not None and key == self.scope.var_key(value):
+                                # 目标与操作数为同一计分板项（如复用了槽位）时，先将目标设为 0 会丢失操作数
+                                return self.negate(target.__metadata__)
                             return [
                                 SetConst(target.__metadata__, 0),
                                 OpSub(target.__metadata__, value.__metadata__)
@@ -243,9 +315,11 @@ class Translator:
                         else:
                             return []
                     case Add():
-                        return AddConst(target.__metadata__, value)
+                        return AddConst(target.__metadata__, value) if value else []
                     case Sub():
-                        return RemConst(target.__metadata__, value)
+                        return RemConst(target.__metadata__, value) if value else []
+                    case Mult() | Div() | FloorDiv() | Mod() if (cmds := self.reduce_strength(op.op, target.__metadata__, value)) is not None:
+                        return cmds
                     case Mult():
                         return OpMul(target.__metadata__, self.scope.get_const_score(value).__metadata__)
                     case Div():
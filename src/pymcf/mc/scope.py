@@ -1,7 +1,7 @@
 from functools import cached_property
 from hashlib import md5
 
-from pymcf.mc.commands import EntityRef, NbtPath, Storage
+from pymcf.mc.commands import EntityRef, NbtPath, Storage, ScoreRef
 
 from .commands import NameRef, AtS
 from ..ast_ import Assign
@@ -20,6 +20,7 @@ class MCFScope(Scope):
         self.consts = {}
         self.locals = []
         self.cb_name = {}
+        self.private_locals: list[int] = []  # 只在函数内部使用的局部变量在 locals 中的下标，构建时确定
         self.tags = tags or set()
         self.macro = macro
 
@@ -32,6 +33,13 @@ class MCFScope(Scope):
         from ..project import Project
         return Storage(f"{Project.instance().name.lower()}:__sys__")  # TODO self.namespace 为什么是 None
 
+    @cached_property
+    def tmp_score(self) -> Score:
+        """
+        生成命令时使用的临时计分板项，只在一个操作翻译出的连续命令中使用，不跨越函数调用，所有函数共用
+        """
+        return Score(NameRef("$tmp"), self.sys_scb)
+
     def get_const_score(self, const: int) -> Score:
         if const not in self.consts:
             self.consts[const] = Score(NameRef(f"$const_{const}"),  self.sys_scb)
@@ -40,6 +48,25 @@ class MCFScope(Scope):
                 Assign(self.consts[const], const)
         return self.consts[const]
 
+    def reset_compile_state(self):
+        self.consts = {}
+        self.cb_name = {}
+        self.private_locals = []
+
+    @staticmethod
+    def var_key(value) -> tuple[str, str] | None:
+        """
+        运行期量对应的计分板项，指向同一计分板项的 Score 对象和命令中的 ScoreRef 表示同一个变量，其余值返回 None
+        """
+        if isinstance(value, Score):
+            target = value.target.__metadata__
+            if isinstance(target, NameRef):
+                return target.name, value.objective.__metadata__.objective
+        elif isinstance(value, ScoreRef):
+            if isinstance(value.target, NameRef):
+                return value.target.name, value.objective.objective
+        return None
+
     def next_local_var_name(self) -> str:
         index = len(self.locals)
         return f"{self.local_namespace}_{index}"  # TODO 变量作用域区分
@@ -1,15 +1,29 @@
 import functools
 import inspect
-from collections import defaultdict
 from contextvars import ContextVar
 from types import FunctionType, MethodType
 from typing import Self, overload, Iterable, Any
 
+from pymcf import profiler
 from pymcf.ast_ import Constructor, reform_func, Call, Scope, compiler_hint, Resolvable, RtBaseVar, RtBaseExc
+from pymcf.ast_ import source_index
 from pymcf.ast_.runtime import RtCtxManager
+from pymcf.config import Config
+from pymcf.session import current_session
 from pymcf.ir.codeblock import IrBlockAttr
 
 
+class McfCfg(Config):
+
+    mcf_max_specializations: int = 0
+    """
+    非内联函数按编译期参数生成的函数体数量上限，为 0 时不限制
+
+    超过上限后，新的参数组中的编译期整数会提升为运行期的 Score 参数，与其他提升后的调用共用同一个函数体。
+    可以通过装饰器参数 max_specializations 为单个函数设置。
+    """
+
+
 class CompileTimeError(BaseException):
     """
     编译期的异常泄露会导致编译的代码流程出现异常，此异常不应被捕获
@@ -28,6 +42,25 @@ type _CtArg = (
 type _AT = _CtArg | RtBaseVar
 
 
+_LIST = object()
+_DICT = object()
+
+def _canonical(value: _CtArg):
+    """
+    编译期量的可哈希形式，相等的编译期量具有相等的形式；无法转换时抛出 TypeError
+    """
+    if isinstance(value, list):
+        return _LIST, tuple(_canonical(v) for v in value)
+    if isinstance(value, tuple):
+        return tuple(_canonical(v) for v in value)
+    if isinstance(value, dict):
+        return _DICT, frozenset((k, _canonical(v)) for k, v in value.items())
+    if isinstance(value, set):
+        return frozenset(value)
+    hash(value)
+    return value
+
+
 class FuncArgs:
     def __init__(self, args: dict[str, _AT], nonlocals: dict[str, _AT]) -> None:
         assert len(set(args.keys()) & set(nonlocals.keys())) == 0  # 参数和 nonlocal 不应该具有相同变量名
@@ -64,6 +97,18 @@ class FuncArgs:
                 return False
         return True
 
+    def key(self) -> tuple | None:
+        """
+        可哈希的特化键，键相等时 FuncArgs 相等；存在无法转换为可哈希形式的编译期参数时返回 None
+        """
+        try:
+            ct_key = tuple(sorted((k, _canonical(v)) for k, v in self.ct_args.items()))
+        except TypeError:
+            return None
+        rt_key = tuple(sorted((k, type(v)) for k, v in self.rt_args.items()))
+        nonlocal_key = tuple(sorted((k, id(v)) for k, v in self.nonlocals.items()))
+        return ct_key, rt_key, nonlocal_key
+
     def __assign__(self, other: Self):
         assert self == other
         for k, v in self.rt_args.items():
@@ -77,6 +122,45 @@ class FuncArgs:
         args.update({k: v.__create_var__() for k, v in self.rt_args.items()})
         return FuncArgs(args, self.nonlocals)
 
+class _Specializations:
+    """
+    函数已构建的特化版本，按构建顺序保存 (参数, 构建结果)
+
+    可哈希的参数通过 FuncArgs.key 索引，其余参数逐个比较。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.promoted_calls = 0  # 超过函数体数量上限后提升了编译期参数的调用次数
+        self.entries: list[tuple[FuncArgs, Scope | Constructor]] = []
+        self._index: dict[tuple, int] = {}
+        self._unindexed: list[int] = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, func_arg: FuncArgs) -> int | None:
+        key = func_arg.key()
+        if key is not None:
+            i = self._index.get(key)
+            if i is not None:
+                return i
+        for i in self._unindexed:
+            if self.entries[i][0] == func_arg:
+                return i
+        return None
+
+    def add(self, func_arg: FuncArgs, func_param: FuncArgs, value: Scope | Constructor) -> int:
+        i = len(self.entries)
+        self.entries.append((func_param, value))
+        key = func_arg.key()
+        if key is None:
+            self._unindexed.append(i)
+        else:
+            self._index[key] = i
+        return i
+
+
 def get_valid_name(func_name: str) -> str:
     return (func_name
             .replace("$wrapper.<locals>.", "")
@@ -92,8 +176,6 @@ class Executor:
     def __init__(self, entity):
         self.entity = entity
 
-_mcfunction_registry = defaultdict(functools.partial(defaultdict, dict))
-
 # noinspection PyPep8Naming
 class mcfunction:
     """
@@ -103,28 +185,30 @@ class mcfunction:
     entrance: 是否为入口函数（手动调用或由#load/#tick标签调用）
     tags: 函数标签
     inline: 是否内联
-    """
+    max_specializations: 函数体数量上限，为 None 时使用配置项 mcf_max_specializations
 
-    _all: list[Self] = []
+    函数定义记录在进程中，模组导入后的每个构建会话都会使用；构建结果（特化版本）记录在当前的构建会话中。
+    """
 
     def __new__(cls, _func=None, /, **kwargs):
 
         def wrap(func):
             if not inspect.isfunction(func):
                 raise TypeError(f"{func!r} 不是一个函数。")
-            try:
-                inspect.getsource(func)
-            except OSError:
-                raise ValueError(f"无法获取函数 {func.__module__}.{func.__qualname__} 的源代码。")
-
-            last = _mcfunction_registry[func.__module__][func.__qualname__].get(func.__code__.co_firstlineno)
+            source = source_index.find_function(func)
+            if source is None:
+                try:
+                    inspect.getsource(func)
+                except OSError:
+                    raise ValueError(f"无法获取函数 {func.__module__}.{func.__qualname__} 的源代码。")
 
             self = object.__new__(cls)
-            _mcfunction_registry[func.__module__][func.__qualname__][func.__code__.co_firstlineno] = self
+            self._source = source  # 定义时的源码，延迟改写时使用，避免源文件在导入后被修改
+            last = current_session().define(self, func.__module__, func.__qualname__, func.__code__.co_firstlineno)
 
             if _func is None:
                 # 说明返回的是 wrapper，需要手动 init
-                self.__init__(func, _arg_scope=last._arg_scope if last is not None else [], **kwargs)
+                self.__init__(func, _arg_scope=last._arg_scope_owner if last is not None else None, **kwargs)
             return self
 
         if _func is None:
@@ -139,6 +223,7 @@ class mcfunction:
                  macro: bool = False,
                  func_name: str = None,
                  throws: Iterable[type[RtBaseExc]] = None,
+                 max_specializations: int = None,
                  _arg_scope = None,  # 继承之前的实例的构建结果
                  **kwargs,
                  ):
@@ -161,9 +246,7 @@ class mcfunction:
             except ValueError:
                 pass
 
-        self._ast_generator = reform_func(_func, wrapper_name="$wrapper")
-
-        self._arg_scope: list[tuple[FuncArgs, Scope | Constructor]] = [] if _arg_scope is None else _arg_scope
+        self._arg_scope_owner: Self = self if _arg_scope is None else _arg_scope
 
         self._tags = tags if tags is not None else set()
         self._entrance = entrance
@@ -172,6 +255,8 @@ class mcfunction:
 
         self._throws = throws  # TODO 指定的异常集和真实异常集的冲突检查
 
+        self._max_specializations = max_specializations
+
         if func_name is None:
             basename = _func.__qualname__.lower()
             if _func.__module__ != "__main__":
@@ -185,7 +270,25 @@ class mcfunction:
         else:
             self.name = self._basename
 
-        mcfunction._all.append(self)
+    @property
+    def _arg_scope(self) -> _Specializations:
+        """
+        当前构建会话中已构建的特化版本，重复定义的函数共用第一个定义的记录
+        """
+        specializations = current_session().specializations
+        owner = self._arg_scope_owner
+        res = specializations.get(owner)
+        if res is None:
+            res = specializations[owner] = _Specializations(owner.name)
+        return res
+
+    @functools.cached_property
+    def _ast_generator(self) -> FunctionType:
+        """
+        改写后的 ast 生成器，在函数第一次被构建时生成，未被使用的函数不进行改写
+        """
+        with profiler.phase("reform_func", self._origin_func.__qualname__):
+            return reform_func(self._origin_func, wrapper_name="$wrapper", source=self._source)
 
     def __call__(self, *args, **kwargs):
         from .mc.scope import MCFScope
@@ -204,30 +307,42 @@ class mcfunction:
             return constr.return_value
         else:
             last_constr = Constructor.current_constr()
+            specializations = self._arg_scope
 
             func_arg = FuncArgs(bound_arg.arguments, self._nonlocals)
-            for func_param, scope_or_constr in self._arg_scope:
-                if func_param == func_arg:
-                    if last_constr is not None:
-                        func_param.__assign__(func_arg)
-                        scope = scope_or_constr if isinstance(scope_or_constr, Scope) else scope_or_constr.scope
-                        last_constr.record_statement(Call(scope, _offline=True))
-                    else:
-                        assert self._entrance
-                    return scope_or_constr.return_value
-
-            if self._entrance and len(self._arg_scope) == 0:
+            i = specializations.find(func_arg)
+            if i is None and last_constr is not None and self._over_budget(specializations):
+                promoted = [k for k, v in func_arg.ct_args.items() if type(v) is int]  # 不提升 bool
+                if promoted:
+                    from .data import Score
+                    for k in promoted:
+                        bound_arg.arguments[k] = Score(bound_arg.arguments[k])
+                    func_arg = FuncArgs(bound_arg.arguments, self._nonlocals)
+                    i = specializations.find(func_arg)
+                    specializations.promoted_calls += 1
+            if i is not None:
+                func_param, scope_or_constr = specializations.entries[i]
+                if last_constr is not None:
+                    func_param.__assign__(func_arg)
+                    scope = scope_or_constr if isinstance(scope_or_constr, Scope) else scope_or_constr.scope
+                    last_constr.record_statement(Call(scope, _offline=True))
+                else:
+                    assert self._entrance
+                return scope_or_constr.return_value
+
+            if self._entrance and len(specializations) == 0:
                 ext = ""
             else:
-                ext = "-" + str(len(self._arg_scope))
+                ext = "-" + str(len(specializations))
 
             func_name = f"{self._basename}{ext}"
-            with Constructor(name=func_name, inline=self._inline, scope=MCFScope(name=func_name, executor=executor, tags=self._tags, set_throws=self._throws, macro=self._macro)) as constr:
-                func_param = func_arg.__create_var__()
-                self._arg_scope.append((func_param, constr))
-                bound_arg_ = self._signature.bind(**func_param.get_args())
-                self._ast_generator(*bound_arg_.args, **bound_arg_.kwargs)
-            constr.finish()
+            with profiler.phase("construct", func_name):
+                with Constructor(name=func_name, inline=self._inline, scope=MCFScope(name=func_name, executor=executor, tags=self._tags, set_throws=self._throws, macro=self._macro)) as constr:
+                    func_param = func_arg.__create_var__()
+                    i = specializations.add(func_arg, func_param, constr)
+                    bound_arg_ = self._signature.bind(**func_param.get_args())
+                    self._ast_generator(*bound_arg_.args, **bound_arg_.kwargs)
+                constr.finish()
 
             if last_constr is not None:
                 func_param.__assign__(func_arg)
@@ -235,13 +350,18 @@ class mcfunction:
             else:
                 assert self._entrance
 
-            for i, (args, _) in enumerate(self._arg_scope):
-                if args is func_arg:
-                    break
-            self._arg_scope[i] = (func_param, constr.scope)
+            specializations.entries[i] = (func_param, constr.scope)
 
             return constr.return_value
 
+    def _over_budget(self, specializations: _Specializations) -> bool:
+        limit = self._max_specializations
+        if limit is None:
+            from .project import Project
+            project = Project.instance()
+            limit = project.config.mcf_max_specializations if project is not None else 0
+        return 0 < limit <= len(specializations)
+
     def __get__(self, instance, owner):
         if instance is None:
             return self
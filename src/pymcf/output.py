@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import zipfile
+from abc import ABC, abstractmethod
+from hashlib import blake2b
+from pathlib import Path, PurePosixPath
+from shutil import rmtree
+from typing import Self
+
+
+class ManifestDiff:
+    """
+    两次输出之间的文件差异
+    """
+
+    _FUNCTION_PATH = re.compile(r"data/([^/]+)/function/(.+)\.mcfunction")
+
+    def __init__(self, added: list[str], modified: list[str], removed: list[str]):
+        self.added = added
+        self.modified = modified
+        self.removed = removed
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.removed)
+
+    @classmethod
+    def functions_of(cls, paths: list[str]) -> list[str]:
+        """
+        从文件路径中筛选出 mcfunction，返回 <namespace>:<name> 形式的函数名
+        """
+        res = []
+        for path in paths:
+            m = cls._FUNCTION_PATH.fullmatch(path)
+            if m is not None:
+                res.append(f"{m.group(1)}:{m.group(2)}")
+        return res
+
+    def to_json(self) -> dict:
+        return {
+            "added": self.added,
+            "modified": self.modified,
+            "removed": self.removed,
+            "functions": {
+                "added": self.functions_of(self.added),
+                "modified": self.functions_of(self.modified),
+                "removed": self.functions_of(self.removed),
+            },
+        }
+
+
+class Manifest:
+    """
+    输出文件的内容哈希清单，用于差异化输出
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.old: dict[str, str] = {}
+        self.new: dict[str, str] = {}
+        self.loaded = False
+        try:
+            with self.path.open("rt", encoding="utf-8") as f:
+                self.old = json.load(f)["files"]
+            self.loaded = True
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def record(self, path: str, data: bytes) -> bool:
+        """
+        记录文件内容
+        :return: 内容相比上次输出是否发生变化
+        """
+        digest = blake2b(data, digest_size=16).hexdigest()
+        self.new[path] = digest
+        return self.old.get(path) != digest
+
+    def diff(self) -> ManifestDiff:
+        added = sorted(p for p in self.new if p not in self.old)
+        modified = sorted(p for p, h in self.new.items() if p in self.old and self.old[p] != h)
+        removed = sorted(p for p in self.old if p not in self.new)
+        return ManifestDiff(added, modified, removed)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("wt", encoding="utf-8") as f:
+            json.dump({"files": self.new}, f)
+
+    def invalidate(self):
+        """
+        输出失败时删除清单，下次输出完整重建
+        """
+        self.path.unlink(missing_ok=True)
+
+
+class OutputSink(ABC):
+    """
+    数据包输出目标
+
+    路径均为数据包内的相对路径（以 / 分隔），内容为 str 时按 utf-8 编码。
+
+    提供 manifest 时记录所有文件的内容哈希，结束后 diff 为本次输出相对上次输出的差异。
+    """
+
+    manifest: Manifest | None = None
+    diff: ManifestDiff | None = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(exc_type is None)
+
+    @staticmethod
+    def normalize(path: PurePosixPath | Path | str) -> str:
+        path = PurePosixPath(Path(path).as_posix())
+        if path.is_absolute() or ".." in path.parts:
+            raise PermissionError(f"bad resource path: {path}")
+        return str(path)
+
+    def write(self, path: PurePosixPath | Path | str, data: str | bytes):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        path = self.normalize(path)
+        if self.manifest is not None and not self.manifest.record(path, data) and self._unchanged(path):
+            return
+        self._write(path, data)
+
+    @abstractmethod
+    def _write(self, path: str, data: bytes): ...
+
+    def _unchanged(self, path: str) -> bool:
+        """
+        内容哈希与上次输出相同的文件是否可以跳过写入
+        """
+        return False
+
+    def _remove(self, paths: list[str]):
+        """
+        删除上次输出中存在而本次输出中不存在的文件
+        """
+
+    def close(self, success: bool = True):
+        """
+        结束输出，success 为 False 时输出可能被丢弃
+        """
+        if self.manifest is None:
+            return
+        if success:
+            self.diff = self.manifest.diff()
+            self._remove(self.diff.removed)
+            self.manifest.save()
+        else:
+            self.manifest.invalidate()
+
+
+class MemorySink(OutputSink):
+    """
+    输出到内存，files 保存所有文件内容
+    """
+
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+
+    def _write(self, path: str, data: bytes):
+        self.files[path] = data
+
+
+class DirectorySink(OutputSink):
+    """
+    输出为未打包的文件夹，clear 为 True 时先清空目标文件夹
+
+    提供 manifest 且上次输出的清单存在时进行差异化输出：只写入内容变化的文件并删除过期文件，不清空文件夹。
+    """
+
+    def __init__(self, root: Path, clear: bool = True, manifest: Manifest | None = None):
+        self.root = Path(root)
+        self.manifest = manifest
+        if clear and not (manifest is not None and manifest.loaded):
+            rmtree(self.root, ignore_errors=True)
+        self._dirs: set[Path] = set()
+
+    def _write(self, path: str, data: bytes):
+        file_path = self.root / path
+        if file_path.parent not in self._dirs:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(file_path.parent)
+        file_path.write_bytes(data)
+
+    def _unchanged(self, path: str) -> bool:
+        return (self.root / path).is_file()
+
+    def _remove(self, paths: list[str]):
+        dirs = set()
+        for path in paths:
+            file_path = self.root / path
+            file_path.unlink(missing_ok=True)
+            dirs.update(file_path.parents)
+        # 由深到浅删除空文件夹
+        for d in sorted((d for d in dirs if d.is_relative_to(self.root) and d != self.root), key=lambda d: len(d.parts), reverse=True):
+            try:
+                d.rmdir()
+            except OSError:
+                pass
+
+
+class ZipSink(OutputSink):
+    """
+    直接写入 zip 文件
+
+    先写入临时文件，成功结束后替换目标文件；成员时间戳固定，内容相同时生成的 zip 相同。
+    """
+
+    DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+    def __init__(self, path: Path, compression: int = zipfile.ZIP_DEFLATED, manifest: Manifest | None = None):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._compression = compression
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", compression)
+
+    def _write(self, path: str, data: bytes):
+        info = zipfile.ZipInfo(path, date_time=self.DATE_TIME)
+        info.compress_type = self._compression
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, data)
+
+    def close(self, success: bool = True):
+        self._zip.close()
+        if success:
+            os.replace(self._tmp_path, self.path)
+        else:
+            self._tmp_path.unlink(missing_ok=True)
+        super().close(success)
+
+
+class TeeSink(OutputSink):
+    """
+    同时输出到多个目标，自身不记录清单，各目标分别按自己的清单进行差异化输出
+    """
+
+    def __init__(self, *sinks: OutputSink):
+        self.sinks = sinks
+
+    @property
+    def diff(self) -> ManifestDiff | None:
+        for sink in self.sinks:
+            if sink.diff is not None:
+                return sink.diff
+        return None
+
+    def _write(self, path: str, data: bytes):
+        for sink in self.sinks:
+            sink.write(path, data)
+
+    def close(self, success: bool = True):
+        for sink in self.sinks:
+            sink.close(success)
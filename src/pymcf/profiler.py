@@ -0,0 +1,170 @@
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Self
+
+_active: "Profiler | None" = None
+_NULL = nullcontext()
+
+
+class _Stat:
+    __slots__ = ("time", "count", "peak")
+
+    def __init__(self):
+        self.time = 0.0
+        self.count = 0
+        self.peak = 0
+
+    def add(self, elapsed: float, peak: int, count: int = 1):
+        self.time += elapsed
+        self.count += count
+        self.peak = max(self.peak, peak)
+
+    def to_json(self) -> dict:
+        return {"time": self.time, "count": self.count, "peak_memory": self.peak}
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "scope", "start", "peak")
+
+    def __init__(self, profiler: "Profiler", name: str, scope: str | None):
+        self.profiler = profiler
+        self.name = name
+        self.scope = scope
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler._exit(self, time.perf_counter() - self.start)
+
+
+class Profiler:
+    """
+    构建性能分析器
+
+    按阶段和 scope 记录耗时、调用次数和峰值内存（tracemalloc）。嵌套的同名阶段只计入一次阶段总耗时，scope 耗时为包含子调用的耗时。
+    """
+
+    FRONTEND_PHASES = {"reform_func", "construct"}
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.phases: dict[str, _Stat] = defaultdict(_Stat)
+        self.scopes: dict[str, dict[str, _Stat]] = defaultdict(lambda: defaultdict(_Stat))
+        self._stack: list[_Phase] = []
+        self._depth: dict[str, int] = defaultdict(int)
+        self._start = None
+        self._started_tracemalloc = False
+        self.total_time = 0.0
+
+    def start(self) -> Self:
+        global _active
+        assert _active is None, "已有正在运行的 Profiler"
+        _active = self
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self) -> Self:
+        global _active
+        if _active is self:
+            _active = None
+        if self._start is not None:
+            self.total_time += time.perf_counter() - self._start
+            self._start = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return self
+
+    def phase(self, name: str, scope: str | None = None) -> _Phase:
+        return _Phase(self, name, scope)
+
+    def _enter(self, phase: _Phase):
+        if self.trace_memory and tracemalloc.is_tracing():
+            # tracemalloc 只有一个全局峰值，进入子阶段前将当前峰值合并到父阶段
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        phase.peak = 0
+        self._stack.append(phase)
+        self._depth[phase.name] += 1
+
+    def _exit(self, phase: _Phase, elapsed: float):
+        self._stack.pop()
+        self._depth[phase.name] -= 1
+        if self.trace_memory and tracemalloc.is_tracing():
+            phase.peak = max(phase.peak, tracemalloc.get_traced_memory()[1])
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak = max(parent.peak, phase.peak)
+        if self._depth[phase.name] == 0:
+            self.phases[phase.name].add(elapsed, phase.peak)
+        if phase.scope is not None:
+            self.scopes[phase.scope][phase.name].add(elapsed, phase.peak)
+
+    def take_records(self) -> dict:
+        """
+        取出并清空已记录的数据，用于从构建子进程传回主进程
+        """
+        res = self.to_json()
+        self.phases.clear()
+        self.scopes.clear()
+        return res
+
+    def merge(self, records: dict):
+        for name, stat in records["phases"].items():
+            self.phases[name].add(stat["time"], stat["peak_memory"], stat["count"])
+        for scope, phases in records["scopes"].items():
+            for name, stat in phases.items():
+                self.scopes[scope][name].add(stat["time"], stat["peak_memory"], stat["count"])
+
+    def to_json(self) -> dict:
+        return {
+            "total_time": self.total_time,
+            "phases": {name: stat.to_json() for name, stat in self.phases.items()},
+            "scopes": {
+                scope: {name: stat.to_json() for name, stat in phases.items()}
+                for scope, phases in self.scopes.items()
+            },
+        }
+
+    def dump(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wt", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, indent=4)
+
+    def summary(self, top: int = 10) -> str:
+        lines = [f"total: {self.total_time:.3f}s", "", f"{'phase':<24}{'time(s)':>10}{'count':>8}{'peak(KiB)':>12}"]
+        for name, stat in sorted(self.phases.items(), key=lambda item: item[1].time, reverse=True):
+            lines.append(f"{name:<24}{stat.time:>10.3f}{stat.count:>8}{stat.peak / 1024:>12.1f}")
+        scope_time = sorted(
+            ((scope, sum(stat.time for name, stat in phases.items() if name not in self.FRONTEND_PHASES))
+             for scope, phases in self.scopes.items()),
+            key=lambda item: item[1], reverse=True,
+        )
+        lines.extend(["", f"top {top} scopes (backend time):"])
+        for scope, t in scope_time[:top]:
+            lines.append(f"  {t:>8.3f}s  {scope}")
+        return "\n".join(lines)
+
+
+def current() -> Profiler | None:
+    return _active
+
+
+def phase(name: str, scope: str | None = None):
+    """
+    记录一个构建阶段，未启用 Profiler 时返回空的上下文管理器
+    """
+    if _active is None:
+        return _NULL
+    return _active.phase(name, scope)
@@ -1,47 +1,77 @@
 import importlib
 import json
+import multiprocessing
 import os
-import zipfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from shutil import rmtree
 from typing import final, Any
 
-from pymcf import exceptions
-from pymcf.ast_ import Constructor, Scope
+from pymcf import exceptions, profiler
+from pymcf.ast_ import Constructor
+from pymcf.cache import BuildCache
 from pymcf.config import Config
-from pymcf.ir import Compiler
+from pymcf.ir import Compiler, private_locals
 from pymcf.mc.code_gen import Translator
 from pymcf.mc.scope import MCFScope
 from pymcf.mcfunction import mcfunction
+from pymcf.output import OutputSink, ZipSink, DirectorySink, TeeSink, Manifest, ManifestDiff
+from pymcf.profiler import Profiler
+from pymcf.session import current_session
 
 
 class ProjectCfg(Config):
     prj_tmp_dir: Path = Path("./.pymcf_tmp")
     prj_install_dir: Path = Path("./pymcf_out")
     prj_pack_format: int = 81
+    prj_output: str = "zip"
+
+    prj_jobs: int = 1
+    """
+    后端编译使用的进程数，为 0 时使用全部 CPU 核心
+    """
+
+    prj_incremental: bool = False
+    """
+    是否启用增量构建，启用后构建结果未变化的函数会复用上次生成的 mcfunction
+    """
+    prj_cache_dir: Path = Path("./.pymcf_cache")
+
+    prj_profile: bool = False
+    """
+    是否记录各构建阶段的耗时和内存，结果写入 <prj_tmp_dir>/profile.json
+    """
+    prj_profile_top: int = 10
+    prj_profile_memory: bool = True
+    """
+    性能分析时是否使用 tracemalloc 记录峰值内存，记录内存会显著增加构建耗时
+    """
 
     tag_func_load: str = "load"
     tag_func_tick: str = "tick"
 
     dbg_viz_ir: bool = False
     dbg_viz_ast: bool = False
+    dbg_dump_datapack: bool = False
 
 
 @final
 class Project:
-
-    _project = None
+    """
+    数据包工程，每个构建会话中只能创建一个
+    """
 
     def __init__(self, name, description=None, **config):
-        if Project._project is not None:
+        session = current_session()
+        if session.project is not None:
             raise ValueError("Project already initialized")
 
-        Project._project = self
+        session.project = self
         self.name = name
         self.description = description or name
 
-        self._config: ProjectCfg = Config(**config)
+        self._config: ProjectCfg = Config(**{**config, **session.config})
 
         self.scb_rec: dict[str, tuple[str, Any]] = {}
         self.scb_init_constr = Constructor(
@@ -50,12 +80,25 @@ class Project:
             inline=False,
         )
 
+        # 之前的会话中导入的模组不会再次执行，重放其顶层代码注册的计分板，以及重新构建前注册的计分板
+        scoreboards = {**session.module_scoreboards(), **session.scoreboards}
+        if scoreboards:
+            from pymcf.data import ScoreBoard
+            for scb_name, (criteria, display_name) in scoreboards.items():
+                ScoreBoard.try_add_new_scb(scb_name, criteria, display_name)
+
         self.const_rec: dict[int, "Score"] = {}
+        self.overflowed: dict[str, int] = {}  # 超过函数体数量上限的函数 -> 提升参数的调用次数
+        self.built = False
+        self.diff: ManifestDiff | None = None  # 最近一次构建的输出差异
+        self.cache_stats: dict[str, int] | None = None  # 增量构建时复用和重新编译的函数数量
         self.resources: list[tuple[Path, Any]] = []
 
+        self.profiler: Profiler | None = None  # 最近一次构建的性能数据，prj_profile 为 True 时记录
+
     @staticmethod
     def instance() -> "Project":
-        return Project._project
+        return current_session().project
 
     @staticmethod
     def add_resource(path: Path | str, data: str | bytes):
@@ -64,7 +107,7 @@ class Project:
         :param path: 数据包内相对路径
         :param data: 数据
         """
-        Project._project.resources.append((Path(path), data))
+        Project.instance().resources.append((Path(path), data))
 
     @staticmethod
     def add_module(path: str, name: str | None = None):
@@ -76,114 +119,249 @@ class Project:
     def config(self) -> Config:
         return Project.instance()._config
 
-    def build(self):
+    def _compile_scope(self, scope: MCFScope, cache: BuildCache | None) -> "ScopeOutput":
+        """
+        编译单个 scope，不修改 scope 以外的构建状态，可以在构建子进程中调用
+        """
+        assert scope.finished
+        if self._config.dbg_viz_ast:
+            from pymcf.visualize import dump_context
+            doc = dump_context(scope)
+            path = self._config.prj_tmp_dir / "viz" / self.name / "ast" / f"{scope.name}.html"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("w", encoding="utf-8") as f:
+                f.write(doc)
+
+        with profiler.phase("fingerprint", scope.name):
+            key = cache.key(scope) if cache is not None else None
+            entry = cache.get(scope.name, key) if cache is not None else None
+        if entry is not None:
+            return ScopeOutput(scope.name, entry["files"], entry["consts"], key, cached=True)
+
+        compiler = Compiler(self._config)
+        cbs = compiler.compile(scope)
+
+        if self._config.dbg_viz_ir:
+            from pymcf.visualize import draw_ir
+            path = self._config.prj_tmp_dir / "viz" / self.name / "ir" / f"{scope.name}.dot"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            draw_ir(cbs[0]).save(path)
+
+        with profiler.phase("translate", scope.name):
+            tr = Translator(scope, self._config)
+            files = []
+            for cb in cbs:
+                mcf = tr.translate(cb)
+                files.append((mcf.name, mcf.gen_code()))
+        return ScopeOutput(scope.name, files, list(scope.consts), key)
+
+    def _compile_scopes(self, scopes: list[MCFScope], cache: BuildCache | None) -> list["ScopeOutput"]:
+        """
+        编译所有构建完成的 scope，prj_jobs 大于 1 时使用进程池并行编译，结果顺序与 scopes 一致
+        """
+        global _pool_state
+        jobs = min(self._config.prj_jobs or os.cpu_count() or 1, len(scopes))
+        if jobs <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+            return [self._compile_scope(scope, cache) for scope in scopes]
+
+        # 子进程通过 fork 继承构建完成的 scope，只需要传递下标
+        _pool_state = (self, scopes, cache)
+        try:
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork"), initializer=_pool_init) as pool:
+                return list(pool.map(_pool_compile, range(len(scopes)), chunksize=max(1, len(scopes) // (jobs * 4))))
+        finally:
+            _pool_state = None
+
+    def _emit_scope(self, scope: MCFScope, output: "ScopeOutput", cache: BuildCache | None, sink: OutputSink):
+        for const in output.consts:
+            scope.get_const_score(const)  # 在主进程中重放常量计分板的初始化
+        if cache is not None:
+            cache.put(output.name, output.key, output.files, output.consts, hit=output.cached)
+
+        if output.profile is not None:
+            profiler.current().merge(output.profile)
+
+        with profiler.phase("output", scope.name):
+            for name, code in output.files:
+                sink.write(f"data/{self.name}/function/{name}.mcfunction", code)
+
+    def default_sink(self) -> OutputSink:
+        """
+        按配置创建输出目标，prj_output 为 "zip" 时输出 <prj_install_dir>/<name>.zip，为 "dir" 时输出 <prj_install_dir>/<name>/
+
+        输出目标带有内容哈希清单，"dir" 输出时只写入发生变化的文件
+        """
+        manifest = Manifest(self._config.prj_cache_dir / f"{self.name}.{self._config.prj_output}.manifest.json")
+        match self._config.prj_output:
+            case "zip":
+                sink = ZipSink(self._config.prj_install_dir / f"{self.name}.zip", manifest=manifest)
+            case "dir":
+                sink = DirectorySink(self._config.prj_install_dir / self.name, manifest=manifest)
+            case _:
+                raise ValueError(f"未知的输出方式：{self._config.prj_output!r}")
+        if self._config.dbg_dump_datapack:
+            sink = TeeSink(sink, DirectorySink(self._config.prj_tmp_dir / "datapack"))
+        return sink
+
+    def build(self, sink: OutputSink | None = None) -> ManifestDiff | None:
+        """
+        构建数据包
+        :param sink: 输出目标，为 None 时按配置输出到 prj_install_dir
+        :return: 输出目标带有内容哈希清单时，返回相对上次构建发生变化的文件，同时写入 <prj_tmp_dir>/changes.json
+        """
+        if not self._config.prj_profile:
+            return self._build(sink)
+
+        # 函数在首次被调用时改写，reform_func 的耗时同样记录在构建过程中
+        self.profiler = Profiler(self._config.prj_profile_memory).start()
+        try:
+            diff = self._build(sink)
+        finally:
+            self.profiler.stop()
+        self.profiler.dump(self._config.prj_tmp_dir / "profile.json")
+        print(self.profiler.summary(self._config.prj_profile_top))
+        return diff
+
+    def _build(self, sink: OutputSink | None) -> ManifestDiff | None:
         if self._config.ir_bf is None:
             from pymcf.data import Score
             self._config.ir_bf = Score("$bf", "__sys__")
 
         rmtree(self._config.prj_tmp_dir, ignore_errors=True)
 
+        session = current_session()
         function_tags = defaultdict(list)
 
         # start construct
-        for mcf in mcfunction._all:
-            if mcf._entrance:
-                mcf()
+        with profiler.phase("construct"):
+            # 构建过程中可能定义新的入口函数
+            called = set()
+            while entries := [mcf for mcf in session.definitions() if mcf._entrance and id(mcf) not in called]:
+                for mcf in entries:
+                    called.add(id(mcf))
+                    mcf()
+
+        self.overflowed = {spec.name: spec.promoted_calls for spec in session.specializations.values() if spec.promoted_calls}
+
+        live_scopes = session.live_scopes()
 
         # TODO namespace
-        for scope in Scope._all:
+        for scope in live_scopes:
             scope.namespace = self.name
 
         # confirm errno
         exceptions.confirm()
 
-        pack_dir_path = self._config.prj_tmp_dir / "datapack"
-
-        for path, data in self.resources:
-            path = pack_dir_path / path
-            if not path.resolve().is_relative_to(pack_dir_path.resolve()):
-                raise PermissionError(f"bad resource path: {path}")
-            path.parent.mkdir(parents=True, exist_ok=True)
-
-            with path.open("wb") as f:
-                if isinstance(data, str):
-                    f.write(data.encode("utf-8"))
-                else:
-                    f.write(data)
-
-        def build_scope(scope: MCFScope):
-            assert scope.finished
-            if self._config.dbg_viz_ast:
-                from pymcf.visualize import dump_context
-                doc = dump_context(scope)
-                path = self._config.prj_tmp_dir / "viz" / self.name / "ast" / f"{scope.name}.html"
-                path.parent.mkdir(parents=True, exist_ok=True)
-                with path.open("w", encoding="utf-8") as f:
-                    f.write(doc)
-
-            compiler = Compiler(self._config)
-            cbs = compiler.compile(scope)
-
-            if self._config.dbg_viz_ir:
-                from pymcf.visualize import draw_ir
-                path = self._config.prj_tmp_dir / "viz" / self.name / "ir" / f"{scope.name}.dot"
-                path.parent.mkdir(parents=True, exist_ok=True)
-                draw_ir(cbs[0]).save(path)
-
-            tr = Translator(scope)
-
-            for cb in cbs:
-                mcf = tr.translate(cb)
-                file_path = pack_dir_path / "data" / self.name / "function" / f"{mcf.name}.mcfunction"
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(file_path, "wt") as f:
-                    f.write(mcf.gen_code())
-
-        for s in Scope._all:
+        # 确定各函数中只在函数内部使用的局部计分板变量，编译时对其进行常量传播、临时变量合并、无用赋值消除和槽位复用
+        private = {}
+        if any((self._config.ir_fold_constants, self._config.ir_coalesce_copies, self._config.ir_dead_store,
+                self._config.ir_reuse_slots)):
+            with profiler.phase("locals"):
+                private = private_locals(
+                    [s for s in live_scopes if s is not self.scb_init_constr.scope], MCFScope.var_key)
+        for scope in live_scopes:
+            scope.private_locals = private.get(scope, [])
+
+        cache = None
+        if self._config.prj_incremental and not self._config.dbg_viz_ir:
+            cache = BuildCache(self._config.prj_cache_dir / f"{self.name}.json", self._config)
+
+        scopes = []
+        for s in live_scopes:
             s: MCFScope
             for tag in s.tags:
                 function_tags[tag].append(f"{s.namespace}:{s.name}")
             if s is self.scb_init_constr.scope:
                 continue  # 未构建完成
-            build_scope(s)
-
-        with self.scb_init_constr:
-            self._config.ir_bf.__assign__(0)
-
-        self.scb_init_constr.finish()
-        build_scope(self.scb_init_constr.scope)
-
-        # 整理 tags
-        for tag, functions in function_tags.items():
-            assert type(tag) is str
-            file_path = pack_dir_path / "data" / self.name / "tags" / "function" / f"{tag}.json"
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            json.dump({"values": functions}, open(file_path, "wt"), indent=4)
-
-        # 写 pack.mcmeta
-        json.dump(
-            {
-                "pack": {
-                    "description": self.description,
-                    "pack_format": self._config.prj_pack_format,
-                }
-            },
-            (pack_dir_path / "pack.mcmeta").open("wt"),
-            indent=4,
-        )
+            scopes.append(s)
+
+        with profiler.phase("compile"):
+            outputs = self._compile_scopes(scopes, cache)
+
+        # 进程池结束后再打开输出目标，避免子进程继承打开的文件
+        if sink is None:
+            sink = self.default_sink()
+
+        with sink:
+            for path, data in self.resources:
+                sink.write(path, data)
+
+            for scope, output in zip(scopes, outputs):
+                self._emit_scope(scope, output, cache, sink)
+
+            with self.scb_init_constr:
+                self._config.ir_bf.__assign__(0)
+
+            self.scb_init_constr.finish()
+            scope = self.scb_init_constr.scope
+            self._emit_scope(scope, self._compile_scope(scope, cache), cache, sink)
+
+            if cache is not None:
+                cache.save()
+                self.cache_stats = {"reused": cache.hits, "compiled": cache.misses}
+
+            # 整理 tags
+            for tag, functions in function_tags.items():
+                assert type(tag) is str
+                sink.write(f"data/{self.name}/tags/function/{tag}.json", json.dumps({"values": functions}, indent=4))
+
+            # 写 pack.mcmeta
+            sink.write("pack.mcmeta", json.dumps(
+                {
+                    "pack": {
+                        "description": self.description,
+                        "pack_format": self._config.prj_pack_format,
+                    }
+                },
+                indent=4,
+            ))
+
+            # 添加 minecraft:#tick/load
+            sink.write("data/minecraft/tags/function/tick.json", json.dumps({"values": [f"#{self.name}:tick"]}, indent=4))
+            sink.write("data/minecraft/tags/function/load.json", json.dumps({"values": [f"#{self.name}:load"]}, indent=4))
+
+        diff = sink.diff
+        if diff is not None:
+            report_path = self._config.prj_tmp_dir / "changes.json"
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            report = diff.to_json()
+            if self.cache_stats is not None:
+                report["incremental"] = self.cache_stats
+            if self.overflowed:
+                report["overflowed"] = self.overflowed
+            with report_path.open("wt", encoding="utf-8") as f:
+                json.dump(report, f, indent=4)
+        self.built = True
+        self.diff = diff
+        return diff
+
+
+class ScopeOutput:
+    """
+    单个 scope 的后端编译结果
+    """
+
+    def __init__(self, name: str, files: list[tuple[str, str]], consts: list[int], key: str | None = None, cached: bool = False):
+        self.name = name
+        self.files = files  # [(mcfunction 名称, 代码), ...]
+        self.consts = consts  # 编译过程中申请的常量计分板
+        self.key = key
+        self.cached = cached
+        self.profile: dict | None = None  # 子进程中记录的性能数据
+
+
+_pool_state: tuple[Project, list[MCFScope], BuildCache | None] | None = None
+
+
+def _pool_init():
+    project = _pool_state[0]
+    if project.profiler is not None:
+        project.profiler.take_records()  # 丢弃从主进程继承的记录
+
 
-        # 添加 minecraft:#tick/load
-        mc_func_tag_path = pack_dir_path / "data/minecraft/tags/function/"
-        mc_func_tag_path.mkdir(parents=True, exist_ok=True)
-        json.dump({"values": [f"#{self.name}:tick"]}, open(mc_func_tag_path / "tick.json", "w"), indent=4)
-        json.dump({"values": [f"#{self.name}:load"]}, open(mc_func_tag_path / "load.json", "w"), indent=4)
-
-        # 打包 zip
-        arch_path = self._config.prj_install_dir / f"{self.name}.zip"
-        arch_path.parent.mkdir(parents=True, exist_ok=True)
-        with zipfile.PyZipFile(arch_path, 'w', zipfile.ZIP_DEFLATED) as pack:
-            for root, dirs, files in os.walk(pack_dir_path):
-                for file in files:
-                    abs_file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(abs_file_path, start=pack_dir_path)
-                    pack.write(abs_file_path, arcname=rel_path)
+def _pool_compile(index: int) -> ScopeOutput:
+    project, scopes, cache = _pool_state
+    output = project._compile_scope(scopes[index], cache)
+    if project.profiler is not None:
+        output.profile = project.profiler.take_records()
+    return output
@@ -0,0 +1,215 @@
+"""
+构建会话
+
+一次构建的全部状态（工程、函数的特化版本、scope、异常编号等）保存在构建会话中，会话结束后一并释放，
+同一个进程可以依次创建多个会话构建不同的数据包：
+
+    for variant in variants:
+        with BuildSession({"prj_install_dir": Path(f"out/{variant}")}):
+            runpy.run_path("pack.py")  # 脚本中创建 Project 并调用 build
+
+没有进入任何会话时使用进程的默认会话。
+
+函数定义属于进程：模组只在第一次导入时执行，其中定义的 mcfunction 和模组顶层代码注册的计分板记录在进程中，
+之后的每个会话都会构建仍然导入着的模组中的定义，与在会话中重新导入模组的结果相同。入口脚本等不再导入的模组中的定义
+在定义它的会话结束后释放。
+
+创建会话时传入的配置项会覆盖会话中 Project 的同名配置项。
+"""
+import gc
+import os
+import sys
+import weakref
+from contextvars import ContextVar
+from types import ModuleType
+from typing import Any, Self
+
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+# 进程中定义的 mcfunction：(模组, 限定名, 行号) -> mcfunction，按第一次定义的顺序排列
+_definitions: dict[tuple[str, str, int], Any] = {}
+# 模组顶层代码注册的计分板：模组名 -> (模组的弱引用, 计分板名 -> (criteria, display_name))
+_module_scoreboards: dict[str, tuple[weakref.ref, dict[str, tuple[str, Any]]]] = {}
+
+
+def _imported(module: str, namespace: dict) -> bool:
+    """
+    namespace 是否为当前导入的 module 的命名空间（runpy 执行的入口脚本在执行结束后不再导入）
+    """
+    m = sys.modules.get(module)
+    return m is not None and vars(m) is namespace
+
+
+def _defined(mcf) -> bool:
+    return _imported(mcf.__module__, mcf.__wrapped__.__globals__)
+
+
+class BuildSession:
+
+    def __init__(self, config: dict[str, Any] | None = None):
+        self.config: dict[str, Any] = dict(config or {})  # 覆盖 Project 的配置项
+        self.project = None  # 会话中的 Project
+        self.mcfunctions: list = []  # 会话中定义的 mcfunction，包括不再导入的入口脚本中的定义
+        self.specializations: dict[Any, Any] = {}  # mcfunction -> 已构建的特化版本
+        self.scopes: list = []
+        self.reused_scopes: set = set()  # 重新构建时复用的 scope
+        self.scoreboards: dict[str, tuple[str, Any]] = {}  # 之前的构建中注册的计分板，重新构建时重放
+
+        self.exc_confirmed = False
+        self.exc_ranges: dict[type, tuple[int, int]] = {}  # RtExc 子类 -> 异常编号范围
+        self.exc_errno: dict[Any, int] = {}  # RtExc 实例 -> 异常编号
+        self.exc_set_table = None  # ExcSet 的异常类注册表
+
+        self._tokens = []
+        self._closed = False
+
+    def __enter__(self) -> Self:
+        assert not self._closed, "构建会话已结束"
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current.reset(self._tokens.pop())
+        if not self._tokens:
+            self.close()
+
+    def rewind(self, modules: set[str]):
+        """
+        为在同一会话中重新构建做准备
+
+        丢弃 modules 中定义的函数、构建未完成的函数，以及（间接）调用了这些函数的函数的构建结果，保留其余函数已构建的 scope；
+        工程、异常编号等单次构建的状态被重置，modules 中定义的异常类不再参与编号。之后重新执行 modules 和入口脚本即可构建新的工程。
+        """
+        from pymcf.ast_ import Scope
+        from pymcf import exceptions
+
+        kept = {
+            owner: spec for owner, spec in self.specializations.items()
+            if owner.__module__ not in modules and all(isinstance(v, Scope) and v.finished for _, v in spec.entries)
+        }
+        while True:
+            scopes = {scope for spec in kept.values() for _, scope in spec.entries}
+            removed = [owner for owner, spec in kept.items() if any(not scope.callees <= scopes for _, scope in spec.entries)]
+            if not removed:
+                break
+            for owner in removed:
+                del kept[owner]
+
+        self.specializations = kept
+        self.scopes = [scope for scope in self.scopes if scope in scopes]
+        self.reused_scopes = scopes
+        for scope in self.scopes:
+            scope.reset_compile_state()
+        self.mcfunctions = [mcf for mcf in self.mcfunctions if mcf.__module__ not in modules]
+        for key in [key for key in _definitions if key[0] in modules]:
+            del _definitions[key]
+
+        if self.project is not None:
+            self.scoreboards.update(self.project.scb_rec)
+        self.project = None
+        self.exc_confirmed = False
+        self.exc_ranges.clear()
+        self.exc_errno.clear()
+        exceptions.forget(modules)
+        gc.collect()  # 回收被丢弃的异常实例，避免影响异常编号
+
+    def define(self, mcf, module: str, qualname: str, lineno: int):
+        """
+        记录函数定义，同一位置的重复定义（重新导入模组或再次执行入口脚本）替换之前的定义
+        :return: 之前的定义，没有时返回 None
+        """
+        key = module, qualname, lineno
+        last = _definitions.get(key)
+        _definitions[key] = mcf
+        self.mcfunctions.append(mcf)
+        return last
+
+    def definitions(self) -> list:
+        """
+        会话中可以使用的函数定义：当前导入的模组中的定义，以及在会话中定义的函数
+        """
+        session_defined = {id(mcf) for mcf in self.mcfunctions}
+        return [mcf for mcf in _definitions.values() if id(mcf) in session_defined or _defined(mcf)]
+
+    def module_scoreboards(self) -> dict[str, tuple[str, Any]]:
+        """
+        当前导入的模组在顶层代码中注册的计分板，模组在之前的会话中导入时需要重放
+        """
+        res = {}
+        for name, (ref, scoreboards) in list(_module_scoreboards.items()):
+            module = ref()
+            if module is None:
+                del _module_scoreboards[name]
+            elif sys.modules.get(name) is module:
+                res.update(scoreboards)
+        return res
+
+    def live_scopes(self) -> list:
+        """
+        需要输出的 scope，复用的 scope 中只保留本次构建仍然会调用的 scope
+        """
+        if not self.reused_scopes:
+            return list(self.scopes)
+        roots = [scope for scope in self.scopes if scope not in self.reused_scopes]
+        for mcf in self.definitions():
+            spec = self.specializations.get(mcf._arg_scope_owner) if mcf._entrance else None
+            if spec is not None:
+                roots.extend(scope for _, scope in spec.entries)
+        live = set()
+        while roots:
+            scope = roots.pop()
+            if scope not in live:
+                live.add(scope)
+                if scope.finished:
+                    roots.extend(scope.callees)
+        return [scope for scope in self.scopes if scope in live]
+
+    def close(self):
+        """
+        结束会话并释放构建状态
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.project = None
+        session_defined = {id(mcf) for mcf in self.mcfunctions}
+        for key in [key for key, mcf in _definitions.items() if id(mcf) in session_defined and not _defined(mcf)]:
+            del _definitions[key]
+        self.mcfunctions.clear()
+        self.specializations.clear()
+        self.scopes.clear()
+        self.reused_scopes = set()
+        self.scoreboards.clear()
+        self.exc_ranges.clear()
+        self.exc_errno.clear()
+        self.exc_set_table = None
+        gc.collect()  # 语句树中存在循环引用，及时回收以便之后的会话分配异常编号时不受影响
+
+
+_default = BuildSession()
+_current: ContextVar[BuildSession] = ContextVar("_current_session", default=_default)
+
+
+def current_session() -> BuildSession:
+    return _current.get()
+
+
+def record_module_scoreboard(name: str, criteria: str, display_name):
+    """
+    记录模组顶层代码注册的计分板：调用栈中第一个不属于 pymcf 的帧是模组的顶层代码，且直接创建了计分板或计分板项
+    （构建过程中注册的计分板不记录）
+    """
+    frame = sys._getframe(1)
+    inner = None
+    while frame is not None and frame.f_code.co_filename.startswith(_PACKAGE_DIR):
+        inner, frame = frame, frame.f_back
+    if frame is None or frame.f_code.co_name != "<module>" or inner is None or inner.f_globals.get("__name__") != "pymcf.data":
+        return
+    module = sys.modules.get(frame.f_globals.get("__name__"))
+    if not isinstance(module, ModuleType) or vars(module) is not frame.f_globals:
+        return
+    item = _module_scoreboards.get(module.__name__)
+    if item is None or item[0]() is not module:
+        item = _module_scoreboards[module.__name__] = weakref.ref(module), {}
+    item[1][name] = (criteria, display_name)
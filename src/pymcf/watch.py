@@ -0,0 +1,146 @@
+"""
+监视模式
+
+常驻进程在一个构建会话中构建数据包，并监视入口脚本和所有 mcfunction 所在的源文件。源文件变化时只重新导入变化的模组及依赖
+它们的模组，丢弃这些模组中的函数及其调用方的构建结果，其余函数直接复用内存中已构建的 scope，之后重新执行入口脚本进行构建。
+"""
+import importlib
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Self
+
+from pymcf.batch import build_notes, run_entry, is_script
+from pymcf.session import BuildSession, current_session
+
+
+class Watcher:
+    """
+    监视并重新构建单个入口，需要在 with 语句中使用，退出时结束构建会话
+
+    config: 覆盖 Project 的配置项
+    on_build: 每次构建结束后调用，参数为变化的源文件、耗时和构建失败时的异常信息
+    """
+
+    def __init__(self, entry: str | Path, config: dict[str, Any] | None = None, interval: float = 0.3,
+                 on_build: Callable[[list[str], float, str | None], None] | None = None):
+        self.entry = entry
+        self.session = BuildSession(config)
+        self.interval = interval
+        self.on_build = on_build if on_build is not None else self._report
+        self._mtimes: dict[str, float] = {}
+
+    def __enter__(self) -> Self:
+        self.session.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.session.__exit__(exc_type, exc_val, exc_tb)
+
+    def _definitions(self) -> list:
+        """
+        会话中可以使用的函数定义，不包括 pymcf 自身定义的函数
+        """
+        return [mcf for mcf in self.session.definitions() if mcf.__module__.partition(".")[0] != "pymcf"]
+
+    def watched_files(self) -> set[str]:
+        files = {
+            os.path.abspath(mcf._origin_func.__code__.co_filename)
+            for mcf in self._definitions()
+        }
+        if is_script(self.entry):
+            files.add(os.path.abspath(self.entry))
+        return {f for f in files if os.path.isfile(f)}
+
+    def _snapshot(self):
+        self._mtimes = {}
+        for f in self.watched_files():
+            try:
+                self._mtimes[f] = os.stat(f).st_mtime_ns
+            except OSError:
+                pass
+
+    def changed_files(self) -> list[str]:
+        changed = []
+        for f, mtime in self._mtimes.items():
+            try:
+                if os.stat(f).st_mtime_ns != mtime:
+                    changed.append(f)
+            except OSError:
+                pass  # 文件被删除时等待重新创建
+        return changed
+
+    def _stale_modules(self, changed: list[str]) -> list[ModuleType]:
+        """
+        需要重新导入的模组：定义在变化的文件中的模组，以及（间接）引用了这些模组中对象的 mcfunction 所在模组，按导入顺序排列
+        """
+        changed = set(changed)
+        candidates = {mcf.__module__ for mcf in self._definitions()}
+        modules = [
+            m for name, m in list(sys.modules.items())
+            if name != "__main__" and isinstance(getattr(m, "__file__", None), str)
+            and (name in candidates or os.path.abspath(m.__file__) in changed)
+        ]
+        stale = {m.__name__ for m in modules if os.path.abspath(m.__file__) in changed}
+        while True:
+            added = False
+            for m in modules:
+                if m.__name__ in stale:
+                    continue
+                for value in list(vars(m).values()):
+                    if (value.__name__ if isinstance(value, ModuleType) else getattr(value, "__module__", None)) in stale:
+                        stale.add(m.__name__)
+                        added = True
+                        break
+            if not added:
+                break
+        return [m for m in modules if m.__name__ in stale]
+
+    def build(self, changed: list[str] = ()) -> str | None:
+        """
+        构建一次，changed 为变化的源文件
+        :return: 构建失败时的异常信息
+        """
+        assert current_session() is self.session
+        start = time.perf_counter()
+        error = None
+        try:
+            if self.session.project is not None:
+                stale = self._stale_modules(changed)
+                self.session.rewind({"__main__", *(m.__name__ for m in stale)})
+                for m in stale:
+                    importlib.reload(m)
+            run_entry(self.entry)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except BaseException:
+            error = traceback.format_exc()
+        self._snapshot()
+        self.on_build(list(changed), time.perf_counter() - start, error)
+        return error
+
+    def _report(self, changed: list[str], elapsed: float, error: str | None):
+        if changed:
+            print(f"检测到修改：{', '.join(os.path.relpath(f) for f in changed)}")
+        if error is None:
+            print(f"构建完成 ({elapsed:.2f}s)")
+            project = self.session.project
+            for note in build_notes(project.cache_stats, project.overflowed):
+                print(f"  {note}")
+        else:
+            print(f"构建失败 ({elapsed:.2f}s)\n{error}", file=sys.stderr)
+
+    def run(self):
+        """
+        构建并持续监视源文件，直到被中断
+        """
+        with self:
+            self.build()
+            while True:
+                time.sleep(self.interval)
+                changed = self.changed_files()
+                if changed:
+                    self.build(changed)